@@ -0,0 +1,118 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Rolling-origin backtesting of ARIMA and VAR forecasts
+
+# Requires: 1st, values should be a 2d array with one column per variable (a single column for ARIMA)
+#
+#           2nd, origins should be sorted
+#
+#           3rd, k_ar should be the lag order chosen by backtest when model is 'var'
+# Modifies: None.
+# Effects: Runs the folds whose forecast origins are in origins one after another and returns forecast errors with
+#          shape (number of origins, horizon, number of variables). Each ARIMA fold starts its optimizer from the
+#          parameters estimated in the previous fold, and every VAR fold is fitted with lag order k_ar. Runs inside a
+#          worker process.
+def _run_fold_block(model, values, origins, horizon, initial_window, window, order, k_ar):
+    from statsmodels.tsa.arima.model import ARIMA
+    from statsmodels.tsa.api import VAR
+
+    errors = np.empty((len(origins), horizon, values.shape[1]))
+    start_params = None
+
+    for n, origin in enumerate(origins):
+        start = origin - initial_window if window == 'sliding' else 0
+        train = values[start:origin]
+        actual = values[origin:origin + horizon]
+
+        if model == 'arima':
+            result = ARIMA(train[:, 0], order=order).fit(start_params=start_params)
+            start_params = result.params
+            predicted = np.asarray(result.forecast(steps=horizon)).reshape(-1, 1)
+        else:
+            result = VAR(train).fit(k_ar)
+            predicted = result.forecast(y=train[-k_ar:], steps=horizon) if k_ar > 0 \
+                else np.tile(result.params[0], (horizon, 1))
+
+        errors[n] = actual - predicted
+
+    return errors
+
+
+
+# Requires: 1st, target_file should be a dataframe whose columns are all in type int or float (ex: the output of
+#           convert_stationarity for VAR, or a single column for ARIMA), with rows in time order
+#
+#           2nd, model should be 'arima' or 'var'. order (p, d, q) is required for 'arima'. k_ar is optional for 'var';
+#           if it is None, the lag order is chosen once by AIC on the first training window and used for every fold.
+#
+#           3rd, window should be 'expanding' or 'sliding'
+# Modifies: None.
+# Effects: Evaluates forecast accuracy using rolling-origin backtesting. Starting with the first initial_window rows,
+#          the model is fitted, forecasts horizon steps ahead and is compared with the actual values. The origin then
+#          moves forward by step rows, with the training window either growing ('expanding') or keeping the length of
+#          initial_window ('sliding'). Folds are split into contiguous blocks that run in a process pool with
+#          n_workers processes, and folds inside a block are warm-started from the previous fold.
+#          Returns a dataframe with MAE, RMSE and MAPE (in %) for each variable and forecast horizon. MAPE ignores
+#          actual values equal to 0.
+# Example: backtest(euro_file_df[['Revenue']], 'arima', horizon=3, initial_window=8, order=(1, 0, 0))
+def backtest(target_file, model, horizon, initial_window, step=1, window='expanding', order=None, k_ar=None,
+             n_workers=None):
+    if model not in ('arima', 'var'):
+        raise ValueError('model should be arima or var')
+    if model == 'arima' and order is None:
+        raise ValueError('order should be given for arima')
+    if window not in ('expanding', 'sliding'):
+        raise ValueError('window should be expanding or sliding')
+
+    values = np.asarray(target_file, dtype=float)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    col_name_list = target_file.columns.values.tolist() if isinstance(target_file, pd.DataFrame) \
+        else [getattr(target_file, 'name', 0)]
+    if model == 'arima':
+        values = values[:, :1]
+        col_name_list = col_name_list[:1]
+
+    origins = np.arange(initial_window, len(values) - horizon + 1, step)
+    if len(origins) == 0:
+        raise ValueError('Data is too short for the given initial_window and horizon')
+
+    # Choosing the VAR lag order once, so results don't depend on how folds are split between workers
+    if model == 'var' and k_ar is None:
+        from statsmodels.tsa.api import VAR
+
+        k_ar = VAR(values[:initial_window]).fit(ic='aic').k_ar
+
+    print('Backtesting ', model, ' on ', len(origins), ' origins...', sep='', end='\n')
+
+    # Splitting origins into contiguous blocks so warm starts can be used within each block
+    if n_workers is None:
+        from os import cpu_count
+        n_workers = cpu_count() or 1
+    origin_blocks = [block for block in np.array_split(origins, min(n_workers, len(origins))) if len(block) > 0]
+
+    with ProcessPoolExecutor(max_workers=len(origin_blocks)) as executor:
+        futures = [executor.submit(_run_fold_block, model, values, block, horizon, initial_window, window, order, k_ar)
+                   for block in origin_blocks]
+        errors = np.concatenate([future.result() for future in futures])
+
+    # Calculating accuracy measures for each variable and horizon
+    actual = np.stack([values[origins + h] for h in range(horizon)], axis=1)
+    abs_errors = np.abs(errors)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_errors = np.where(actual != 0, abs_errors / np.abs(actual), np.nan)
+
+    report_list = []
+    for k, col_name in enumerate(col_name_list):
+        report_list.append(pd.DataFrame({
+            'variable': col_name,
+            'horizon': np.arange(1, horizon + 1),
+            'MAE': abs_errors[:, :, k].mean(axis=0),
+            'RMSE': np.sqrt((errors[:, :, k] ** 2).mean(axis=0)),
+            'MAPE': np.nanmean(pct_errors[:, :, k], axis=0) * 100,
+        }))
+
+    return pd.concat(report_list, ignore_index=True)
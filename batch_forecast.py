@@ -0,0 +1,240 @@
+import pandas as pd
+import numpy as np
+
+# Batched ARIMA for many short series of the same length and order.
+# Instead of fitting one statsmodels model per series, series are stacked into a (number of series, length) array.
+# Parameter estimation, Kalman filtering, likelihood evaluation and forecasting are then done for all series at once,
+# looping only over time steps and optimizer iterations.
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# State-space form of ARMA(p, q)
+
+# Requires: params should be an array of shape (number of series, p + q) holding AR then MA coefficients.
+# Modifies: None.
+# Effects: Builds the transition matrix T and the state noise covariance RR' (with variance 1) of the ARMA(p, q) model
+#          of every series, using the state-space form with r = max(p, q + 1) states and y_t equal to the first state.
+def _arma_matrices(params, p, q):
+    n_series = params.shape[0]
+    r = max(p, q + 1)
+
+    T = np.zeros((n_series, r, r))
+    T[:, :p, 0] = params[:, :p]
+    T[:, np.arange(r - 1), np.arange(1, r)] = 1
+
+    R = np.zeros((n_series, r))
+    R[:, 0] = 1
+    R[:, 1:q + 1] = params[:, p:p + q]
+
+    return T, R[:, :, None] * R[:, None, :]
+
+
+
+# Requires: T and RR should be outputs of _arma_matrices.
+# Modifies: None.
+# Effects: Returns the unconditional state covariance of every series, solving P = T P T' + RR' as one batched linear
+#          system. Series whose AR part is not stationary get a large diagonal covariance instead (approximate diffuse
+#          initialization).
+def _initial_cov(T, RR):
+    n_series, r, _ = T.shape
+
+    P0 = np.tile(np.eye(r) * 1e6, (n_series, 1, 1))
+    stationary = np.abs(np.linalg.eigvals(T)).max(axis=1) < 1 - 1e-8
+    if stationary.any():
+        kron = np.einsum('bij,bkl->bikjl', T[stationary], T[stationary]).reshape(-1, r * r, r * r)
+        lyapunov = np.eye(r * r) - kron
+        P0[stationary] = np.linalg.solve(lyapunov, RR[stationary].reshape(-1, r * r, 1)).reshape(-1, r, r)
+
+    return P0
+
+
+
+# Requires: 1st, y should be an array of shape (number of series, length) of stationary, mean zero data
+#
+#           2nd, T and RR should be outputs of _arma_matrices
+# Modifies: None.
+# Effects: Runs the Kalman filter over all series at once with state noise variance 1. Returns the one-step-ahead
+#          prediction errors and their variances, both of shape (number of series, length), and the predicted state
+#          for the time step right after the data.
+def _kalman_filter(y, T, RR):
+    n_series, n_obs = y.shape
+    r = T.shape[1]
+
+    state = np.zeros((n_series, r))
+    P = _initial_cov(T, RR)
+    errors = np.empty((n_series, n_obs))
+    error_var = np.empty((n_series, n_obs))
+
+    for t in range(n_obs):
+        F = P[:, 0, 0]
+        v = y[:, t] - state[:, 0]
+        K = np.einsum('bij,bj->bi', T, P[:, :, 0]) / F[:, None]
+
+        errors[:, t] = v
+        error_var[:, t] = F
+
+        state = np.einsum('bij,bj->bi', T, state) + K * v[:, None]
+        P = T @ P @ T.transpose(0, 2, 1) + RR - K[:, :, None] * K[:, None, :] * F[:, None, None]
+
+    return errors, error_var, state
+
+
+
+# Requires: same as _kalman_filter, with params of shape (number of series, p + q).
+# Modifies: None.
+# Effects: Returns the exact Gaussian log-likelihood of every series with the innovation variance concentrated out,
+#          together with the estimated innovation variance. Invalid parameters get a log-likelihood of -inf.
+def _concentrated_loglike(y, params, p, q):
+    T, RR = _arma_matrices(params, p, q)
+    errors, error_var, _ = _kalman_filter(y, T, RR)
+    n_obs = y.shape[1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = np.mean(errors ** 2 / error_var, axis=1)
+        loglike = -0.5 * n_obs * (np.log(2 * np.pi) + np.log(sigma2) + 1) - 0.5 * np.log(error_var).sum(axis=1)
+    loglike[~np.isfinite(loglike) | (error_var <= 0).any(axis=1)] = -np.inf
+
+    return loglike, sigma2
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Parameter estimation
+
+# Requires: X should have shape (number of series, rows, columns) and y shape (number of series, rows).
+# Modifies: None.
+# Effects: Solves the least squares problem of every series at once using its normal equations.
+def _batched_lstsq(X, y):
+    XtX = X.transpose(0, 2, 1) @ X + np.eye(X.shape[2]) * 1e-8
+    Xty = np.einsum('bij,bi->bj', X, y)
+
+    return np.linalg.solve(XtX, Xty[:, :, None])[:, :, 0]
+
+
+
+# Requires: X should have shape (number of series, length) and k >= 1.
+# Modifies: None.
+# Effects: Returns lagged copies of X with shape (number of series, length - start, k), where column j is X lagged by
+#          j + 1, starting from time step start.
+def _lag_matrix(X, k, start):
+    return np.stack([X[:, start - j - 1:X.shape[1] - j - 1] for j in range(k)], axis=2)
+
+
+
+# Requires: y should be an array of shape (number of series, length) of stationary, mean zero data.
+# Modifies: None.
+# Effects: Estimates ARMA(p, q) parameters of every series at once with the Hannan-Rissanen method: a long AR model is
+#          fitted by least squares to approximate the innovations, then y is regressed on its own lags and lags of
+#          those innovations. Returns an array of shape (number of series, p + q).
+def _hannan_rissanen(y, p, q):
+    n_series, n_obs = y.shape
+    if p + q == 0:
+        return np.zeros((n_series, 0))
+
+    regressors = []
+    start = p
+    if q > 0:
+        long_ar = min(max(p, q) + 3, (n_obs - 1) // 2)
+        ar_coef = _batched_lstsq(_lag_matrix(y, long_ar, long_ar), y[:, long_ar:])
+        innovations = np.zeros_like(y)
+        innovations[:, long_ar:] = y[:, long_ar:] - np.einsum('bij,bj->bi', _lag_matrix(y, long_ar, long_ar), ar_coef)
+        start = max(p, long_ar + q)
+    if p > 0:
+        regressors.append(_lag_matrix(y, p, start))
+    if q > 0:
+        regressors.append(_lag_matrix(innovations, q, start))
+
+    return _batched_lstsq(np.concatenate(regressors, axis=2), y[:, start:])
+
+
+
+# Requires: y should be an array of shape (number of series, length) of stationary, mean zero data.
+# Modifies: None.
+# Effects: Refines start_params of every series at once by gradient ascent on the concentrated log-likelihood.
+#          Gradients are taken by finite differences, so each iteration costs p + q + 2 batched Kalman filter runs no
+#          matter how many series there are. Each series keeps its own step size, which is halved whenever a step
+#          does not improve its log-likelihood.
+def _refine_params(y, start_params, p, q, n_iter):
+    params = start_params.copy()
+    loglike, _ = _concentrated_loglike(y, params, p, q)
+    step = np.full(params.shape[0], 0.1)
+    eps = 1e-5
+
+    for _ in range(n_iter):
+        grad = np.empty_like(params)
+        for k in range(params.shape[1]):
+            shifted = params.copy()
+            shifted[:, k] += eps
+            grad[:, k] = (_concentrated_loglike(y, shifted, p, q)[0] - loglike) / eps
+        grad[~np.isfinite(grad)] = 0
+        grad_norm = np.sqrt((grad ** 2).sum(axis=1))
+        direction = grad / np.where(grad_norm == 0, 1, grad_norm)[:, None]
+
+        candidate = params + step[:, None] * direction
+        candidate_loglike, _ = _concentrated_loglike(y, candidate, p, q)
+        improved = candidate_loglike > loglike
+        params[improved] = candidate[improved]
+        loglike[improved] = candidate_loglike[improved]
+        step = np.where(improved, step * 1.2, step * 0.5)
+
+    return params
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Batched ARIMA
+
+# Requires: 1st, target_file should be a dataframe with one column per series, or an array of shape
+#           (number of series, length). All series should have the same length and no missing values.
+#
+#           2nd, order should be (p, d, q) shared by all series, and length - d should be larger than 2 * (p + q) + 3
+# Modifies: None.
+# Effects: Fits ARIMA(p, d, q) to every series at once and forecasts steps ahead. Series are differenced d times
+#          (and demeaned when d is 0), parameters are estimated with Hannan-Rissanen and refined for n_iter
+#          iterations on the exact likelihood from a batched Kalman filter, then forecasts are made from the final
+#          filtered state and integrated back to the original scale.
+#          Returns forecasts (steps rows, one column per series, indexed by time as in data_analysis.arima) and a
+#          dataframe with the estimated parameters, innovation variance and log-likelihood of every series.
+# Example: batch_arima(series_df, (1, 1, 0), 5) fits thousands of ARIMA(1, 1, 0) models in a few array operations
+def batch_arima(target_file, order, steps, n_iter=20):
+    p, d, q = order
+
+    if isinstance(target_file, pd.DataFrame):
+        series_name_list = target_file.columns.values.tolist()
+        Y = target_file.values.T.astype(float)
+    else:
+        Y = np.asarray(target_file, dtype=float)
+        series_name_list = list(range(Y.shape[0]))
+    n_obs = Y.shape[1]
+
+    if n_obs - d <= 2 * (p + q) + 3:
+        raise ValueError('Series are too short for the given order')
+
+    # Differencing all series at once, keeping the last value at every level to undo it later
+    seeds = []
+    y = Y.copy()
+    for _ in range(d):
+        seeds.append(y[:, -1])
+        y = np.diff(y, axis=1)
+    mean = y.mean(axis=1) if d == 0 else np.zeros(y.shape[0])
+    y = y - mean[:, None]
+
+    # Estimating parameters
+    params = _hannan_rissanen(y, p, q)
+    if n_iter > 0 and p + q > 0:
+        params = _refine_params(y, params, p, q, n_iter)
+    loglike, sigma2 = _concentrated_loglike(y, params, p, q)
+
+    # Forecasting from the predicted state right after the data
+    T, RR = _arma_matrices(params, p, q)
+    _, _, state = _kalman_filter(y, T, RR)
+    forecast = np.empty((y.shape[0], steps))
+    for h in range(steps):
+        forecast[:, h] = state[:, 0]
+        state = np.einsum('bij,bj->bi', T, state)
+    forecast += mean[:, None]
+    for seed in reversed(seeds):
+        forecast = seed[:, None] + np.cumsum(forecast, axis=1)
+
+    forecast_df = pd.DataFrame(forecast.T, columns=series_name_list, index=range(n_obs, n_obs + steps))
+    param_col_list = ['ar.L' + str(i + 1) for i in range(p)] + ['ma.L' + str(i + 1) for i in range(q)]
+    params_df = pd.DataFrame(params, index=series_name_list, columns=param_col_list)
+    params_df['sigma2'] = sigma2
+    params_df['loglike'] = loglike
+
+    return forecast_df, params_df
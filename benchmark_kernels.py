@@ -0,0 +1,50 @@
+import time
+import numpy as np
+import kernels
+
+# Times every kernel in kernels.py with the NumPy and Numba backends on the same random data.
+# Run with: python benchmark_kernels.py (Numba should be installed)
+
+# Requires: Numba should be installed.
+# Modifies: None.
+# Effects: Runs every kernel with both backends on random data with n_rows rows and n_cols columns and prints the best
+#          of repeat run times for each backend. The backend in use is restored afterwards. Returns a dictionary
+#          mapping each kernel to (numpy seconds, numba seconds).
+def benchmark_backends(n_rows=1000000, n_cols=10, repeat=3):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(n_rows, n_cols))
+    mean = data.mean(axis=0)
+    inverse_cov = np.linalg.inv(np.cov(data, rowvar=False))
+
+    kernel_calls = {
+        'mahalanobis': lambda: kernels.mahalanobis(data, mean, inverse_cov),
+        'diff': lambda: kernels.diff(data[:, 0], 2),
+        'z_score': lambda: kernels.z_score(data),
+        'min_max': lambda: kernels.min_max(data),
+    }
+
+    previous_backend = kernels.get_backend()
+    timing = {}
+    try:
+        for kernel_name, kernel_call in kernel_calls.items():
+            run_time = {}
+            for backend_name in ('numpy', 'numba'):
+                kernels.set_backend(backend_name)
+                kernel_call()  # first call also triggers JIT compilation
+                run_times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    kernel_call()
+                    run_times.append(time.perf_counter() - start)
+                run_time[backend_name] = min(run_times)
+            timing[kernel_name] = (run_time['numpy'], run_time['numba'])
+            print(kernel_name, ': numpy = ', run_time['numpy'], 's, numba = ', run_time['numba'], 's', sep='', end='\n')
+    finally:
+        kernels.set_backend(previous_backend)
+
+    return timing
+
+
+
+if __name__ == '__main__':
+    benchmark_backends()
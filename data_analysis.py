@@ -4,6 +4,8 @@ from scipy import stats
 import matplotlib.pyplot as plt
 import math
 import utility_functions as uf
+import kernels
+import report as rp
 
 
 # Requires: All other columns except for a column that contains data should either be in type float or int.
@@ -28,7 +30,7 @@ def stat_measures(target_file, target_file_name, date_col_name):
 
 # Requires: All other columns except for a column that contains data should either be in type float or int.
 # Modifies: None.
-# Effects: Builds ARIMA and graph the result.
+# Effects: Builds ARIMA and graph the result. Returns the fitted result so that it can be saved and updated later.
 def arima(target_file,target_col_name, steps):
     from statsmodels.tsa.arima.model import ARIMA
     from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
@@ -38,10 +40,11 @@ def arima(target_file,target_col_name, steps):
 
     # Running Augmented Dickey-Fuller test to determine d value
     print('Augmented Dickey-Fuller (ADF) test using significant level (alpha) of 0.05: ')
-    temp_data = target_file[target_col_name].copy()
+    temp_data = target_file[target_col_name]
     d = 0
     while True:
         adf_test_result = adfuller(temp_data.dropna())
+        rp.record_test('ADF', adf_test_result[0], adf_test_result[1], column=target_col_name, d=d)
         if adf_test_result[1] < 0.05:
             # Data is stationary
             print('data is stationary at d =', d, end='\n')
@@ -49,7 +52,7 @@ def arima(target_file,target_col_name, steps):
             break
         else:
             # Data is non stationary
-            temp_data = temp_data.diff()
+            temp_data = pd.Series(kernels.diff(temp_data.values), index=temp_data.index)
             d += 1
 
     # Plotting PACF and ACF to determine q and p
@@ -72,14 +75,16 @@ def arima(target_file,target_col_name, steps):
     model = ARIMA(target_file[target_col_name], order=(pdq_input[0], d, pdq_input[1]))
     result = model.fit()
 
-    print(result.summary())
+    rp.log(result.summary(), level=2)
+    rp.record_model('ARIMA', (pdq_input[0], d, pdq_input[1]), column=target_col_name)
 
     # Making predictions
     predictions = result.get_forecast(steps=steps)
     predicted_values = predictions.predicted_mean
+    rp.record_forecast('ARIMA', predicted_values)
 
-    print('ARIMA results:', end='\n')
-    print(predicted_values)
+    rp.log('ARIMA results:', end='\n')
+    rp.log(predicted_values)
 
     # Graphing ARIMA results
     plt.plot(target_file[target_col_name], label='Observed')
@@ -89,6 +94,8 @@ def arima(target_file,target_col_name, steps):
     plt.legend()
     plt.show()
 
+    return result
+
 
 # -----------------------------------------------------------------------------------------------------------------------------
 # Building vector autoregression (VAR)
@@ -96,18 +103,23 @@ def arima(target_file,target_col_name, steps):
 # Requires: 1st, all other columns except for a column that contains data should either be in type float or int.
 #
 #           2nd, target_file must be stationarity.
+#
+#           3rd, if target_file was made stationary with data_clean.convert_stationarity, transform can be the
+#           transform returned by it
 # Modifies: None.
-# Effects: Performs VAR using OLS and graph the result.
-def var(target_file, steps):
+# Effects: Performs VAR using OLS and graph the result. If transform is given, predictions are also mapped back to the
+#          original scale of the data and shown. Returns the fitted result so that it can be saved and updated later.
+def var(target_file, steps, transform=None):
     from statsmodels.tsa.api import VAR
 
     model = VAR(target_file)
     result = model.fit(ic='aic')
-    print('Lag order:', result.k_ar)
+    rp.log('Lag order:', result.k_ar)
+    rp.record_model('VAR', result.k_ar)
 
     # Fitting
     fitted_model = model.fit(result.k_ar)
-    print(fitted_model.summary())
+    rp.log(fitted_model.summary(), level=2)
 
     # Making predictions
     lag = target_file.values[-result.k_ar:]
@@ -115,9 +127,19 @@ def var(target_file, steps):
     predictions_index = range(len(target_file), len(target_file) + steps)
     predictions_df = pd.DataFrame(predictions, columns=target_file.columns, index=predictions_index)
 
-    print('VAR predictions:', end='\n')
-    print(predictions_df, end='\n')
-    print('Note that index above represents time, where index 0 is the base period', end = '\n\n')
+    rp.record_forecast('VAR', predictions_df)
+
+    rp.log('VAR predictions:', end='\n')
+    rp.log(predictions_df, end='\n')
+    rp.log('Note that index above represents time, where index 0 is the base period', end = '\n\n')
+
+    if transform is not None:
+        import data_clean as dc
+
+        level_predictions_df = dc.invert_differencing(predictions_df, transform)
+        rp.record_forecast('VAR (original scale)', level_predictions_df)
+        rp.log('VAR predictions in original scale:', end='\n')
+        rp.log(level_predictions_df, end='\n\n')
 
     # Graphing results
     for i in target_file.columns.values.tolist():
@@ -127,3 +149,104 @@ def var(target_file, steps):
     plt.title('VAR Graph')
     plt.legend()
     plt.show()
+
+    return fitted_model
+
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Saving fitted models and updating their forecasts
+
+# Requires: model_result should be a fitted result returned by arima or var.
+# Modifies: None.
+# Effects: Saves model_result to file_name using pickle.
+def save_model(model_result, file_name):
+    import pickle
+
+    with open(file_name, 'wb') as model_file:
+        pickle.dump(model_result, model_file)
+
+
+
+# Requires: file_name should be a file written by save_model.
+# Modifies: None.
+# Effects: Loads and returns a fitted model saved with save_model.
+def load_model(file_name):
+    import pickle
+
+    with open(file_name, 'rb') as model_file:
+        return pickle.load(model_file)
+
+
+
+# Requires: 1st, arima_result should be a fitted result returned by arima, fitted on data with a positional index
+#
+#           2nd, new_obs should be a list, array or series of new observations that come right after the data that
+#           arima_result has seen
+# Modifies: None.
+# Effects: Appends new_obs to arima_result by running the Kalman filter over them with the estimated parameters kept
+#          fixed, then forecasts steps ahead. This avoids re-estimating the model every time new data arrives.
+#          Drift is measured as the RMSE of the one-step-ahead errors on new_obs divided by the standard deviation of
+#          the in-sample residuals. Only when drift exceeds drift_threshold are the parameters re-estimated, starting
+#          from the previous estimates. Returns the updated result and the forecasts.
+def update_arima(arima_result, new_obs, steps, drift_threshold=2.0):
+    n_obs = arima_result.nobs
+    # Using the name of the fitted series (ex: 'Revenue') since statsmodels only appends data with matching names
+    new_obs = pd.Series(np.asarray(new_obs, dtype=float), index=pd.RangeIndex(n_obs, n_obs + len(new_obs)),
+                        name=arima_result.model.endog_names)
+
+    updated_result = arima_result.append(new_obs, refit=False)
+
+    # Checking drift using one-step-ahead errors on new observations
+    in_sample_resid = np.asarray(arima_result.resid)[arima_result.loglikelihood_burn:]
+    new_resid = np.asarray(updated_result.resid)[-len(new_obs):]
+    drift = np.sqrt(np.mean(new_resid ** 2)) / np.std(in_sample_resid)
+
+    if drift > drift_threshold:
+        print('Drift of', drift, 'exceeds threshold of', drift_threshold, '- refitting ARIMA', end='\n')
+        updated_result = updated_result.model.fit(start_params=arima_result.params)
+
+    return updated_result, updated_result.forecast(steps=steps)
+
+
+
+# Requires: 1st, var_result should be a fitted result returned by var
+#
+#           2nd, new_obs should be a dataframe or 2d array of new observations, in the same column order as the data
+#           var_result was fitted on, that come right after the data that var_result has seen
+#
+#           3rd, appended should be None on the first update, then the appended value returned by the previous update
+# Modifies: None.
+# Effects: Forecasts steps ahead from the latest lags without re-estimating the coefficients. All observations
+#          received since the last fit are kept in appended so that the next update forecasts from the right lags.
+#          Drift is measured per column as the RMSE of one-step-ahead errors on new_obs divided by the residual
+#          standard deviation of the fit. When the largest drift exceeds drift_threshold, the model is re-estimated on
+#          all data with the same lag order and appended is cleared. Returns the (possibly refitted) result,
+#          appended, and the forecasts as a dataframe.
+def update_var(var_result, new_obs, steps, appended=None, drift_threshold=2.0):
+    from statsmodels.tsa.api import VAR
+
+    k_ar = var_result.k_ar
+    new_obs = np.asarray(new_obs, dtype=float)
+    if appended is None:
+        appended = np.empty((0, new_obs.shape[1]))
+
+    history = np.vstack([var_result.endog[-k_ar:], appended, new_obs])[-(k_ar + len(new_obs)):]
+
+    # Checking drift using one-step-ahead errors on new observations
+    one_step = np.vstack([var_result.forecast(y=history[i:i + k_ar], steps=1) for i in range(len(new_obs))])
+    rmse = np.sqrt(np.mean((new_obs - one_step) ** 2, axis=0))
+    drift = np.max(rmse / np.sqrt(np.diag(var_result.sigma_u)))
+
+    appended = np.vstack([appended, new_obs])
+
+    if drift > drift_threshold:
+        print('Drift of', drift, 'exceeds threshold of', drift_threshold, '- refitting VAR', end='\n')
+        all_data = pd.DataFrame(np.vstack([var_result.endog, appended]), columns=var_result.names)
+        var_result = VAR(all_data).fit(k_ar)
+        appended = np.empty((0, new_obs.shape[1]))
+
+    predictions = var_result.forecast(y=history[-k_ar:], steps=steps)
+    n_seen = var_result.nobs + k_ar + len(appended)
+    predictions_df = pd.DataFrame(predictions, columns=var_result.names, index=range(n_seen, n_seen + steps))
+
+    return var_result, appended, predictions_df
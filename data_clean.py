@@ -4,6 +4,8 @@ import re
 from scipy import stats
 import matplotlib.pyplot as plt
 import utility_functions as uf
+import kernels
+import report as rp
 
 # Converting data type
 
@@ -11,9 +13,10 @@ import utility_functions as uf
 # Modifies: target_file.
 # Effects: 1st, removes all unnecessary characters in all non-date inputs of the data, then convert them into type float
 #
-#          2nd, converts date inputs into datetime
+#          2nd, converts date inputs into datetime using parse_dates. Dates that can't be parsed become NaT. If
+#          return_unparsed is True, a boolean series marking those rows is returned together with the data.
 # Example: $100,000.01 -> 100,000.01
-def convert_input(target_file, date_col_name):
+def convert_input(target_file, date_col_name, date_formats=None, return_unparsed=False):
     target_file_df = pd.DataFrame(target_file)
 
     non_date_col_list = target_file.columns.values.tolist()
@@ -23,12 +26,94 @@ def convert_input(target_file, date_col_name):
         # Removing all characters except for dot and numbers in columns that aren't the date column
         target_file_df[i] = target_file_df[i].replace(r'[^\d.]', '', regex=True).astype(float)
 
-    target_file_df[date_col_name] = pd.to_datetime(target_file_df[date_col_name], format='%m/%d/%Y')
+    target_file_df[date_col_name], unparsed = parse_dates(target_file_df[date_col_name], date_formats=date_formats)
+    if unparsed.any():
+        rp.log(unparsed.sum(), 'date/s could not be parsed and were set to NaT', end='\n')
+
+    if return_unparsed:
+        return target_file_df, unparsed
 
     return target_file_df
 
 
 
+# Formats tried by parse_dates when date_formats is not given, in order of preference when they parse equally well
+date_format_list = ['%m/%d/%Y', '%m/%d/%y', '%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d', '%d.%m.%Y', '%m/%d/%Y %H:%M',
+                    '%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f',
+                    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%d %H:%M:%S%z', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M:%S.%f%z']
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns True if date_format puts the day before the month (ex: '%d/%m/%Y'), False if it puts the month
+#          first (ex: '%m/%d/%Y'), and None if it has no day and month or starts with the year (ex: '%Y-%m-%d'), which
+#          can't be confused with either.
+def _day_first(date_format):
+    if '%d' not in date_format or '%m' not in date_format:
+        return None
+    year_pos_list = [date_format.index(i) for i in ('%Y', '%y') if i in date_format]
+    if year_pos_list and min(year_pos_list) < min(date_format.index('%d'), date_format.index('%m')):
+        return None
+
+    return date_format.index('%d') < date_format.index('%m')
+
+
+
+# Requires: date_series should be a series of date strings.
+# Modifies: None.
+# Effects: Converts date_series into datetime. Each distinct string is parsed only once and the results are broadcast
+#          back to all rows, which is much faster when the same dates repeat many times. The format is inferred
+#          once by trying date_formats (date_format_list by default) on the first sample_size distinct strings;
+#          formats are then applied in order of how many sample strings they parsed, so data mixing several formats
+#          is also handled. Formats that read day and month in the opposite order of the best format are never used,
+#          so a column isn't read partly month-first and partly day-first; strings only they could parse are reported
+#          as unparsed. If the best format has a time zone (%z), all dates are converted to UTC.
+#          Returns the parsed series and a boolean series marking rows that had a date that couldn't be parsed.
+# Example: ['5/5/2025', '5/5/2025', '2025-05-06', 'abc'] -> [2025-05-05, 2025-05-05, 2025-05-06, NaT],
+#          unparsed = [False, False, False, True]
+def parse_dates(date_series, date_formats=None, sample_size=100):
+    if date_formats is None:
+        date_formats = date_format_list
+
+    codes, unique_dates = pd.factorize(date_series.astype(str).str.strip().where(date_series.notnull()))
+    unique_dates = pd.Series(unique_dates)
+
+    # Nothing to parse when every date is missing
+    if len(unique_dates) == 0:
+        return pd.Series(pd.NaT, index=date_series.index, dtype='datetime64[ns]'), \
+            pd.Series(False, index=date_series.index)
+
+    # Inferring format from a small sample of distinct strings
+    sample = unique_dates.iloc[:sample_size]
+    score_list = [pd.to_datetime(sample, format=f, errors='coerce', utc='%z' in f).notnull().sum() for f in date_formats]
+    ordered_formats = [date_formats[n] for n in sorted(range(len(date_formats)), key=lambda n: -score_list[n])]
+    use_utc = '%z' in ordered_formats[0] and max(score_list) > 0
+    best_day_first = _day_first(ordered_formats[0]) if max(score_list) > 0 else None
+
+    parsed_dtype = 'datetime64[ns, UTC]' if use_utc else 'datetime64[ns]'
+    parsed_unique = pd.Series(pd.NaT, index=unique_dates.index, dtype=parsed_dtype)
+    remaining = pd.Series(True, index=unique_dates.index)
+    for f in ordered_formats:
+        if not remaining.any():
+            break
+        if '%z' in f and not use_utc:
+            continue
+        if best_day_first is not None and _day_first(f) not in (None, best_day_first):
+            continue
+        parsed = pd.to_datetime(unique_dates[remaining], format=f, errors='coerce', utc=use_utc)
+        parsed_unique.loc[parsed.index] = parsed
+        remaining = parsed_unique.isnull()
+
+    # Broadcasting parsed distinct values back to all rows. Missing dates have code -1.
+    parsed_series = parsed_unique.take(np.where(codes >= 0, codes, 0)).set_axis(date_series.index)
+    parsed_series[codes < 0] = pd.NaT
+    unparsed = pd.Series((codes >= 0) & parsed_series.isnull().values, index=date_series.index)
+
+    return parsed_series, unparsed
+
+
+
 # Requires: 1st, all date inputs should be in type datetime
 #
 #           2nd, all non-date inputs should be in type int or float
@@ -51,15 +136,23 @@ def convert_money_input_to_str(target_file, date_col_name, currency_unit):
 #----------------------------------------------------------------------------------------------------------------------------------------------
 # Checking for missing data entries
 
-# Requires: None.
+# Requires: if impute_method is given, date_col_name should also be given (see impute_missing).
 # Modifies: Possibly target_file.
 # Effects: Checks for all missing inputs on target_file, then gives a chance for the user to remove the missing data.
-def check_for_missing(target_file):
+#          If impute_method is given, missing values are imputed with impute_missing instead of asking the user.
+def check_for_missing(target_file, impute_method=None, date_col_name=None, season_length=None):
+    if impute_method is not None and date_col_name is None:
+        raise ValueError('date_col_name should be given when impute_method is used')
+
     # Checking for missing data
     print('Checking for missing data...', end='\n')
     nan_row = target_file[target_file.isnull().any(axis=1)]
+    # Imputing without asking the user when a method has been chosen in advance
+    if len(nan_row) >= 1 and impute_method is not None:
+        rp.log(len(nan_row), ' row/s that contain missing value will be imputed using ', impute_method, sep='', end='\n')
+        target_file = impute_missing(target_file, date_col_name, method=impute_method, season_length=season_length)
     # Giving choice to remove missing inputs if they exist
-    if len(nan_row) >= 1:
+    elif len(nan_row) >= 1:
         print('Row/s that contain missing value:', end='\n')
         print(nan_row)
         print("Do you wish to remove any missing data? Type yes or no.", end='\n')
@@ -80,8 +173,7 @@ def check_for_missing(target_file):
                 target_file = uf.del_file_data(target_file=target_file)
                 target_file.reset_index(drop=True, inplace=True)
 
-                print('Data after removing: ', end='\n')
-                print(target_file, end='\n\n')
+                rp.show_frame(target_file, 'Data after removing: ')
                 break
             elif user_input == 'no':
                 break
@@ -93,15 +185,118 @@ def check_for_missing(target_file):
 
     return target_file
 
+
+
+# Requires: 1st, column that contains dates should be in type datetime and rows should be sorted by date
+#
+#           2nd, all non-date inputs should be in type int or float
+#
+#           3rd, method should be 'ffill', 'linear', 'time' or 'seasonal'. season_length (number of rows in one
+#           season) is required for 'seasonal'.
+# Modifies: None.
+# Effects: Imputes missing values instead of deleting rows, so regular spacing needed by arima is kept.
+#          'ffill' repeats the last observed value, 'linear' interpolates by row position, 'time' interpolates
+#          weighted by the time between dates, and 'seasonal' copies the value observed season_length rows earlier.
+#          target_file can be a single dataframe, which is processed chunk_size rows at a time, or any iterable of
+#          sorted dataframe chunks. State needed at chunk boundaries (last observed values, the last complete row
+#          before a gap, or the previous season) is carried over, so the result is the same as imputing in one pass.
+#          For 'linear' and 'time', values before the first or after the last observation are left missing, and rows
+#          whose date is missing (ex: a blank row read as NaT) are passed through untouched and not used as end points.
+def impute_missing(target_file, date_col_name, method='ffill', season_length=None, chunk_size=100000):
+    if method not in ('ffill', 'linear', 'time', 'seasonal'):
+        raise ValueError('method should be one of ffill, linear, time or seasonal')
+    if method == 'seasonal' and (season_length is None or season_length < 1):
+        raise ValueError('season_length should be a positive integer for seasonal imputation')
+
+    if isinstance(target_file, pd.DataFrame):
+        chunks = (target_file.iloc[i:i + chunk_size] for i in range(0, len(target_file), chunk_size))
+    else:
+        chunks = target_file
+
+    imputed_list = []
+    carry_over = None
+
+    for chunk in chunks:
+        non_date_col_list = chunk.columns.values.tolist()
+        non_date_col_list.remove(date_col_name)
+        chunk = chunk.copy()
+
+        if method == 'ffill':
+            chunk[non_date_col_list] = chunk[non_date_col_list].ffill()
+            # Filling the start of this chunk with the last values observed in previous chunks
+            if carry_over is not None:
+                chunk[non_date_col_list] = chunk[non_date_col_list].fillna(carry_over)
+                carry_over = chunk[non_date_col_list].iloc[-1].fillna(carry_over)
+            elif len(chunk) > 0:
+                carry_over = chunk[non_date_col_list].iloc[-1]
+            imputed_list.append(chunk)
+
+        elif method == 'seasonal':
+            # Prepending the previous season so the first rows of this chunk can be filled
+            n_carried = 0
+            if carry_over is not None:
+                n_carried = len(carry_over)
+                chunk = pd.concat([carry_over, chunk])
+            values = chunk[non_date_col_list]
+            n_missing = values.isnull().values.sum()
+            while n_missing > 0:
+                values = values.fillna(values.shift(season_length))
+                new_n_missing = values.isnull().values.sum()
+                if new_n_missing == n_missing:
+                    break
+                n_missing = new_n_missing
+            chunk[non_date_col_list] = values
+            carry_over = chunk.iloc[-season_length:]
+            imputed_list.append(chunk.iloc[n_carried:])
+
+        else:
+            # Prepending the last complete row and the rows after it, which are still waiting for the next observed
+            # value, so gaps that span a chunk boundary are interpolated between the right end points
+            n_emitted = 0
+            if carry_over is not None:
+                n_emitted = carry_over[1]
+                chunk = pd.concat([carry_over[0], chunk])
+            # Interpolating only over rows with a date, rows whose date is missing are passed through untouched
+            dated_pos = np.flatnonzero(chunk[date_col_name].notnull().values)
+            col_pos = [chunk.columns.get_loc(i) for i in non_date_col_list]
+            values = chunk.iloc[dated_pos, col_pos]
+            if method == 'time':
+                values = values.set_axis(pd.DatetimeIndex(chunk[date_col_name].iloc[dated_pos]))
+            chunk.iloc[dated_pos, col_pos] = values.interpolate(method=method, limit_area='inside').values
+
+            # Finding the last row up to which every column has seen its last observed value
+            valid_mask = np.zeros((len(chunk), len(col_pos)), dtype=bool)
+            valid_mask[dated_pos] = values.notnull().values
+            has_valid = valid_mask.any(axis=0)
+            anchor = 0
+            if has_valid.any():
+                last_valid_pos = len(valid_mask) - 1 - np.argmax(valid_mask[::-1], axis=0)
+                anchor = last_valid_pos[has_valid].min()
+            imputed_list.append(chunk.iloc[n_emitted:anchor + 1])
+            carry_over = (chunk.iloc[anchor:], 1)
+
+    # Emitting rows that were still waiting for an observed value when the data ended
+    if method in ('linear', 'time') and carry_over is not None and len(carry_over[0]) > carry_over[1]:
+        imputed_list.append(carry_over[0].iloc[carry_over[1]:])
+
+    if len(imputed_list) == 0:
+        return pd.DataFrame(columns=[date_col_name])
+
+    imputed_df = pd.concat(imputed_list)
+    imputed_df.reset_index(drop=True, inplace=True)
+
+    return imputed_df
+
 #----------------------------------------------------------------------------------------------------------------------------------------------
 
-# Requires: None.
+# Requires: if date_dup_policy is given, it should be 'sum', 'mean', 'first' or 'last'.
 # Modifies: Possibly target_file.
 # Effects: 1st, checks for duplicates that have the same value throughout all columns and remove one them right away.
 #
 #          2nd, checks for duplicates that have the same data value, then gives a chance to th user regarding removing
-#          one of them.
-def check_duplicates(target_file, date_col_name):
+#          one of them. If date_dup_policy is given, rows with the same date are collapsed with
+#          collapse_date_duplicates instead of asking the user.
+def check_duplicates(target_file, date_col_name, date_dup_policy=None):
     print('Checking for duplicates...', end='\n')
 
     # 1st dealing with duplicates that have the same value throughout all columns
@@ -122,8 +317,7 @@ def check_duplicates(target_file, date_col_name):
         target_file.drop(index=all_val_dup_index, inplace=True)
         target_file.reset_index(drop=True, inplace=True)
 
-        print('Data after taking care of exact duplicates:', end='\n')
-        print(target_file)
+        rp.show_frame(target_file, 'Data after taking care of exact duplicates:')
     else:
         no_all_val_dup_indicator = True
 
@@ -131,8 +325,12 @@ def check_duplicates(target_file, date_col_name):
     date_val_dup = target_file[date_col_name].duplicated(keep=False)  # keep = False since I wish to display all
     no_date_val_dup_indicator = False                                 # duplicated data in this case.
 
+    # Collapsing data that has the same date without asking the user when a policy has been chosen in advance
+    if any(date_val_dup) and date_dup_policy is not None:
+        target_file, n_merged = collapse_date_duplicates(target_file, date_col_name, date_dup_policy)
+        rp.log(n_merged, ' row/s with duplicated dates were merged using ', date_dup_policy, sep='', end='\n')
     # Giving user the choice to deal with data that has the same date if it exists
-    if any(date_val_dup):
+    elif any(date_val_dup):
         print('Date duplicates: ', end='\n')
         print(target_file[date_val_dup], end='\n')
         print('Do you wish to remove any duplicated data above? Type yes or no.', end='\n')
@@ -146,8 +344,7 @@ def check_duplicates(target_file, date_col_name):
                 target_file = uf.del_file_data(target_file=target_file)
                 target_file.reset_index(drop=True, inplace=True)
 
-                print('Data after taking care of date duplicates:', end='\n')
-                print(target_file)
+                rp.show_frame(target_file, 'Data after taking care of date duplicates:')
                 break
             elif date_dup_remove_input == 'no':
                 break
@@ -161,6 +358,37 @@ def check_duplicates(target_file, date_col_name):
 
     return target_file
 
+
+
+# Requires: 1st, all non-date inputs should be in type int or float
+#
+#           2nd, how should be 'sum', 'mean', 'first' or 'last'
+# Modifies: None.
+# Effects: Collapses rows that share the same date into one row in a single pass. 'sum' and 'mean' aggregate the
+#          non-date columns of those rows, while 'first' and 'last' keep the first or last of those rows as they appear.
+#          Rows whose date is missing are treated as sharing one date, under every policy. Rows keep the order in which
+#          their date first appears and columns keep their order. Returns the collapsed data and the number of rows that
+#          were merged away.
+# Example: 2 rows dated 5/5/2025 with Revenue 10 and 20, how = 'sum' -> 1 row dated 5/5/2025 with Revenue 30
+def collapse_date_duplicates(target_file, date_col_name, how):
+    if how in ('first', 'last'):
+        # Numbering dates in order of first appearance, with all missing dates sharing one number as in groupby below
+        codes = pd.factorize(target_file[date_col_name], use_na_sentinel=False)[0]
+        keep_pos = np.flatnonzero(~pd.Series(codes).duplicated(keep=how).values)
+        collapsed_file = target_file.iloc[keep_pos[np.argsort(codes[keep_pos], kind='stable')]]
+    elif how in ('sum', 'mean'):
+        grouped = target_file.groupby(date_col_name, sort=False, dropna=False, as_index=False)
+        # min_count=1 keeps a group whose values are all missing as missing instead of 0
+        collapsed_file = grouped.sum(min_count=1) if how == 'sum' else grouped.mean()
+        collapsed_file = collapsed_file[target_file.columns]
+    else:
+        raise ValueError('how should be one of sum, mean, first or last')
+
+    n_merged = len(target_file) - len(collapsed_file)
+    collapsed_file = collapsed_file.reset_index(drop=True)
+
+    return collapsed_file, n_merged
+
 #----------------------------------------------------------------------------------------------------------------------------------------------
 # Checking outliers
 
@@ -169,7 +397,6 @@ def check_duplicates(target_file, date_col_name):
 # Effects: Identifies outliers in a data using Z-score method with threshold given by the user and gives a chance to the
 # user regarding removing identified outliers.
 def out_z_score(target_file, date_col_name):
-    outlier_z = []
     non_date_col_list = target_file.columns.values.tolist()
     non_date_col_list.remove(date_col_name)
 
@@ -190,16 +417,16 @@ def out_z_score(target_file, date_col_name):
             print('Invalid threshold input. Please type again.')
         # outlier test based on user provided threshold
         else:
-            z_score = stats.zscore(target_file[non_date_col_list])
-            outlier = target_file[np.abs(z_score) > z_threshold_input]
+            z_score = kernels.z_score(target_file[non_date_col_list].values)
+            outlier_row = (np.abs(z_score) > z_threshold_input).any(axis=1)
+            outlier = target_file[outlier_row].copy()
             break
     # Appending Z-score to data
-    for i in range(0, len(outlier)):
-        outlier_index = outlier.index[i]
-        outlier_z.append(z_score[outlier_index])
-
-    outlier = outlier.copy()
-    outlier['Z-score'] = outlier_z
+    if len(non_date_col_list) == 1:
+        outlier['Z-score'] = z_score[outlier_row, 0]
+    else:
+        for n, i in enumerate(non_date_col_list):
+            outlier[i + ' Z-score'] = z_score[outlier_row, n]
     # Giving user the choice to remove outliers if they exist
     if outlier.empty == False:
         print('Outlier found using Z-score method with threshold of ±', z_threshold_input, ':', sep='', end='\n')
@@ -220,8 +447,7 @@ def out_z_score(target_file, date_col_name):
                 print('Note that row index is located at the left most area of outliers displayed above.', end='\n')
 
                 target_file = uf.del_file_data(target_file=target_file)
-                print('Data after removing outliers:', end='\n')
-                print(target_file, end='\n\n')
+                rp.show_frame(target_file, 'Data after removing outliers:')
                 break
             elif outlier_dec_input == 'no':
                 break
@@ -293,8 +519,7 @@ def out_iqr(target_file, date_col_name):
                       end='\n')
 
                 target_file = uf.del_file_data(target_file=target_file)
-                print('Data after removing outliers:', end='\n')
-                print(target_file, end='\n\n')
+                rp.show_frame(target_file, 'Data after removing outliers:')
                 break
             elif outlier_dec_input == 'no':
                 break
@@ -316,46 +541,216 @@ def out_iqr(target_file, date_col_name):
 # Modifies: None.
 # Effects: Calculates Mahalanobis distance
 def mahalanobis_dist(data, mean, cov):
-    from scipy.spatial.distance import mahalanobis
-
-    mah_dist = []
-    data = pd.DataFrame(data)
-
     try:
         inverse_cov = np.linalg.inv(cov)
     except np.linalg.LinAlgError:
         cov += np.eye(cov.shape[0]) * 1e-6
         inverse_cov = np.linalg.inv(cov)
 
-    for i in range(data.shape[0]):
-        mah_dist.append(mahalanobis(data.iloc[i], mean, inverse_cov))
+    mah_dist = kernels.mahalanobis(np.asarray(data), mean, inverse_cov).tolist()
 
     return mah_dist
 
 
 
+# Requires: data should be a matrix with real number entries and at least 2 rows.
+# Modifies: None.
+# Effects: Builds a covariance state from data in one pass. The state is a dictionary holding the number of rows
+#          ('n'), the mean ('mean'), the matrix of summed squared deviations ('scatter', equal to cov * (n - 1)) and its
+#          inverse ('inv_scatter'). It can be downdated with downdate_cov_state as rows are removed, and used with
+#          cov_state_mahalanobis to calculate Mahalanobis distance.
+def build_cov_state(data):
+    data = np.asarray(data, dtype=float)
+
+    mean = data.mean(axis=0)
+    centered = data - mean
+    scatter = centered.T @ centered
+
+    try:
+        inv_scatter = np.linalg.inv(scatter)
+    except np.linalg.LinAlgError:
+        scatter += np.eye(scatter.shape[0]) * 1e-6 * (len(data) - 1)
+        inv_scatter = np.linalg.inv(scatter)
+
+    return {'n': len(data), 'mean': mean, 'scatter': scatter, 'inv_scatter': inv_scatter}
+
+
+
+# Requires: 1st, cov_state should be the output of build_cov_state
+#
+#           2nd, removed_rows should be a matrix of rows that were part of the data cov_state was built from
+# Modifies: cov_state.
+# Effects: Removes removed_rows from cov_state without going back to the data. Removing a row x changes the scatter
+#          matrix by a rank-one term, scatter - n / (n - 1) * (x - mean)(x - mean)^T, so its inverse is updated with the
+#          Sherman-Morrison formula in O(p^2) per row instead of re-inverting the matrix. If an update would make the
+#          scatter matrix close to singular, the inverse is recomputed directly.
+def downdate_cov_state(cov_state, removed_rows):
+    removed_rows = np.atleast_2d(np.asarray(removed_rows, dtype=float))
+
+    for x in removed_rows:
+        n = cov_state['n']
+        if n <= 2:
+            raise ValueError('At least 2 rows should remain in cov_state')
+        deviation = x - cov_state['mean']
+        weight = n / (n - 1)
+
+        cov_state['mean'] = (n * cov_state['mean'] - x) / (n - 1)
+        cov_state['scatter'] -= weight * np.outer(deviation, deviation)
+        cov_state['n'] = n - 1
+
+        inv_deviation = cov_state['inv_scatter'] @ deviation
+        denominator = 1 - weight * deviation @ inv_deviation
+        if denominator > 1e-10:
+            cov_state['inv_scatter'] += weight * np.outer(inv_deviation, inv_deviation) / denominator
+        else:
+            cov_state['inv_scatter'] = np.linalg.pinv(cov_state['scatter'])
+
+    return cov_state
+
+
+
+# Requires: 1st, cov_state should be the output of build_cov_state or downdate_cov_state
+#
+#           2nd, data should be a matrix with the same number of columns as the data cov_state was built from
+# Modifies: None.
+# Effects: Calculates Mahalanobis distance of every row of data using the mean and inverse covariance in cov_state.
+def cov_state_mahalanobis(cov_state, data):
+    inverse_cov = cov_state['inv_scatter'] * (cov_state['n'] - 1)
+
+    return kernels.mahalanobis(data, cov_state['mean'], inverse_cov)
+
+
+
+# Requires: 1st, all non-date inputs should be in type int or float
+#
+#           2nd, 0 < alpha < 1
+# Modifies: None.
+# Effects: Removes outliers without asking the user. In each round, rows whose squared Mahalanobis distance exceeds
+#          the chi-square quantile at significance level alpha (i.e. whose distance exceeds its square root) are
+#          removed, and the covariance state is downdated for the removed rows instead of being rebuilt. Stops when a
+#          round removes nothing or after max_rounds rounds.
+def remove_mahalanobis_outliers(target_file, date_col_name, alpha, max_rounds=10):
+    data = target_file.drop(date_col_name, axis=1)
+    values = data.values
+    # Squared Mahalanobis distance follows chi-square, so the distance is compared with the square root of the quantile
+    m_threshold = np.sqrt(stats.chi2.ppf(1 - alpha, data.shape[1]))
+
+    cov_state = build_cov_state(values)
+    keep = np.ones(len(values), dtype=bool)
+
+    for _ in range(max_rounds):
+        keep_pos = np.flatnonzero(keep)
+        m_dist = cov_state_mahalanobis(cov_state, values[keep_pos])
+        outlier_pos = keep_pos[m_dist > m_threshold]
+        if len(outlier_pos) == 0 or cov_state['n'] - len(outlier_pos) <= 2:
+            break
+        cov_state = downdate_cov_state(cov_state, values[outlier_pos])
+        keep[outlier_pos] = False
+
+    rp.log('Removed', (~keep).sum(), 'outlier/s using Mahalanobis distance with threshold of', m_threshold, end='\n')
+    target_file = target_file[keep].reset_index(drop=True)
+
+    return target_file
+
+
+
+# Requires: 1st, all non-date inputs should be in type int or float
+#
+#           2nd, 0 < alpha < 1
+# Modifies: None.
+# Effects: Runs Z-score, IQR and Mahalanobis distance outlier tests on all non-date columns at once, without asking the
+#          user. Mean, standard deviation, quartiles and covariance are computed once, then rows are scored
+#          chunk_size rows at a time with vectorized operations. Returns 2 dataframes with the same index as
+#          target_file:
+#          flags, one boolean column per test ('z_score', 'iqr', 'mahalanobis') marking rows that fail it
+#          scores, the Z-score of every column ('<column> Z-score'), the distance outside the IQR bounds in units of
+#          IQR for every column ('<column> IQR distance', 0 inside the bounds) and the Mahalanobis distance.
+#          A row fails the Mahalanobis test when its distance exceeds the square root of the chi-square quantile at
+#          significance level alpha. That threshold, in the same units as 'Mahalanobis distance', is kept in
+#          scores.attrs['mahalanobis_threshold'].
+#          If pack_bits is True, flags is returned as a uint8 array of packed bits (one byte per row) instead.
+# Example: flags, scores = outlier_sweep(euro_file_df, 'Date'); vote_outliers(flags, 2) -> rows flagged by 2+ tests
+def outlier_sweep(target_file, date_col_name, z_threshold=3, iqr_threshold=1.5, alpha=0.05, chunk_size=100000,
+                  pack_bits=False):
+    non_date_col_list = target_file.columns.values.tolist()
+    non_date_col_list.remove(date_col_name)
+    values = target_file[non_date_col_list].values.astype(float)
+
+    # Computing statistics used by all tests once
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+    q1, q3 = np.quantile(values, [0.25, 0.75], axis=0)
+    iqr = q3 - q1
+    iqr_scale = np.where(iqr == 0, 1, iqr)
+    lower_bound = q1 - iqr_threshold * iqr
+    upper_bound = q3 + iqr_threshold * iqr
+    cov_state = build_cov_state(values)
+    # Squared Mahalanobis distance follows chi-square, so the distance is compared with the square root of the quantile
+    m_threshold = np.sqrt(stats.chi2.ppf(1 - alpha, values.shape[1]))
+
+    n_col = len(non_date_col_list)
+    flags = np.empty((len(values), 3), dtype=bool)
+    score_values = np.empty((len(values), 2 * n_col + 1))
+
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        end = start + len(chunk)
+
+        z_score = kernels.z_score(chunk, mean, std)
+        iqr_distance = np.maximum(lower_bound - chunk, 0) + np.maximum(chunk - upper_bound, 0)
+        m_dist = cov_state_mahalanobis(cov_state, chunk)
+
+        flags[start:end, 0] = (np.abs(z_score) > z_threshold).any(axis=1)
+        flags[start:end, 1] = (iqr_distance > 0).any(axis=1)
+        flags[start:end, 2] = m_dist > m_threshold
+        score_values[start:end, :n_col] = z_score
+        score_values[start:end, n_col:2 * n_col] = iqr_distance / iqr_scale
+        score_values[start:end, -1] = m_dist
+
+    score_col_list = [i + ' Z-score' for i in non_date_col_list] + [i + ' IQR distance' for i in non_date_col_list] \
+        + ['Mahalanobis distance']
+    scores = pd.DataFrame(score_values, index=target_file.index, columns=score_col_list)
+    scores.attrs['mahalanobis_threshold'] = m_threshold
+
+    if pack_bits:
+        return np.packbits(flags, axis=1), scores
+
+    return pd.DataFrame(flags, index=target_file.index, columns=['z_score', 'iqr', 'mahalanobis']), scores
+
+
+
+# Requires: flags should be the first output of outlier_sweep with pack_bits set to False.
+# Modifies: None.
+# Effects: Combines outlier tests by vote. Returns a boolean series marking rows flagged by at least min_votes tests.
+def vote_outliers(flags, min_votes):
+    return flags.sum(axis=1) >= min_votes
+
+
+
 # Requires: 1st, all non-date inputs should be in type int or float
 #
 #           2nd, 0 < alpha < 1
 # Modifies: Possibly target_file.
 # Effects: Determines outliers using Mahalanobis distance with threshold for Mahalanobis distance given by the user.
-#          Then, gives a choice to users regarding removing identified outliers.
-def out_mahalanobis_dist(target_file, date_col_name, alpha):
+#          Then, gives a choice to users regarding removing identified outliers. If cov_state (see build_cov_state) for
+#          the current rows is given, it is used instead of recomputing the mean and covariance.
+def out_mahalanobis_dist(target_file, date_col_name, alpha, cov_state=None):
     data = target_file.drop(date_col_name, axis=1)
 
-    mean = data.mean().values
-    cov = data.cov().values
+    if cov_state is None:
+        cov_state = build_cov_state(data.values)
     # Calculating Mahalanobis distance
-    m_dist = mahalanobis_dist(data, mean, cov)
-    # Calculating chi-square so that is can be used as a threshold if user wants to
+    m_dist = cov_state_mahalanobis(cov_state, data.values)
+    # Calculating chi-square so that is can be used as a threshold if user wants to. Squared Mahalanobis distance
+    # follows chi-square, so the threshold for the distance itself is the square root of the chi-square value.
     degree_of_freedom = data.shape[1]
-    chi_square = stats.chi2.ppf(1 - alpha, degree_of_freedom)
+    chi_square = np.sqrt(stats.chi2.ppf(1 - alpha, degree_of_freedom))
 
     data['Mahalanobis distance'] = m_dist
 
     print('Type a threshold for Mahalanobis Distance', end='\n')
-    print('Commonly used Threshold is chi-square value, which is', chi_square, 'using significance level of',alpha, end='\n')
-    print('You can type "chi2" is you want your threshold to be the chi-square value calculated above', end='\n')
+    print('Commonly used Threshold is square root of chi-square value, which is', chi_square, 'using significance level of',alpha, end='\n')
+    print('You can type "chi2" is you want your threshold to be the square root of chi-square value calculated above', end='\n')
     # Taking user input for threshold
     while True:
         m_threshold_input = ''
@@ -391,8 +786,7 @@ def out_mahalanobis_dist(target_file, date_col_name, alpha):
                       end='\n')
 
                 target_file = uf.del_file_data(target_file=target_file)
-                print('Data after removing outliers:', end='\n')
-                print(target_file, end='\n\n')
+                rp.show_frame(target_file, 'Data after removing outliers:')
                 break
             elif outlier_dec_input == 'no':
                 break
@@ -420,6 +814,7 @@ def out_mahalanobis_dist(target_file, date_col_name, alpha):
 def check_outliers(target_file, date_col_name):
     non_date_col_list = target_file.columns.values.tolist()
     non_date_col_list.remove(date_col_name)
+    cov_state = None
 
     # 1st, plotting to get some sense of outliers.
     # Plotting 2d graph when there are only 2 variables in the data.
@@ -464,9 +859,8 @@ def check_outliers(target_file, date_col_name):
 
         data = target_file.drop(date_col_name, axis=1)
 
-        mean = data.mean().values
-        cov = data.cov().values
-        m_dist = mahalanobis_dist(data, mean, cov)
+        cov_state = build_cov_state(data.values)
+        m_dist = cov_state_mahalanobis(cov_state, data.values)
 
         plt.bar(target_file.index, m_dist, color='deepskyblue')
 
@@ -485,9 +879,10 @@ def check_outliers(target_file, date_col_name):
             plot_out_del_input = plot_out_del_input.replace(' ', '')
             if plot_out_del_input == 'yes':
                 print('Provide row index or indices of outliers that you wish to remove.')
-                target_file = uf.del_file_data(target_file=target_file)
-                print('Data after removing outliers:', end='\n')
-                print(target_file, end='\n\n')
+                target_file, deleted_index = uf.del_file_data(target_file=target_file, return_deleted=True)
+                # Keeping the covariance state in line with the remaining rows for the Mahalanobis test below
+                cov_state = downdate_cov_state(cov_state, data.loc[deleted_index].values)
+                rp.show_frame(target_file, 'Data after removing outliers:')
                 break
             elif plot_out_del_input == 'no':
                 break
@@ -534,7 +929,7 @@ def check_outliers(target_file, date_col_name):
             break
         # Running test in more than 2 variables case
         elif stat_method_dec_input == 'yes' and len(target_file.columns) > 2:
-            target_file = out_mahalanobis_dist(target_file, date_col_name, 0.05)
+            target_file = out_mahalanobis_dist(target_file, date_col_name, 0.05, cov_state=cov_state)
             break
         elif stat_method_dec_input == 'no':
             break
@@ -551,34 +946,232 @@ def check_outliers(target_file, date_col_name):
 # Requires: column that contains dates should be in type datetime.
 # Modifies: target_file.
 # Effects: Arranges data based on content of target_col_name in the order smallest to greatest or oldest to newest.
+#          If inplace is True, target_file is reordered one column at a time instead of being copied as a whole, so
+#          only one column needs extra memory on top of the reordered columns.
 # Example: if target_col_name = 'Date', then this function arranges file based on dates, where the oldest date
 # comes first.
-def arrange_file(target_file, target_col_name):
-    sorted_file = target_file.sort_values(by=[target_col_name])
+def arrange_file(target_file, target_col_name, inplace=False):
+    # Skipping the sort when the data is already in order, which is the common case for appended data
+    if target_file[target_col_name].is_monotonic_increasing:
+        sorted_file = target_file
+    elif inplace:
+        # Positions of rows in sorted order, with missing dates last as in sort_values
+        order = target_file[target_col_name].reset_index(drop=True).sort_values(kind='mergesort').index.values
+        sorted_file = target_file
+        for i in sorted_file.columns.values.tolist():
+            sorted_file[i] = sorted_file[i].array.take(order)
+    else:
+        sorted_file = target_file.sort_values(by=[target_col_name], kind='mergesort')
 
     sorted_file.reset_index(drop=True, inplace=True)
 
     print('Arranging file...', end='\n')
-    print('Data after arranging data by ', target_col_name, ':', sep='', end='\n')
-    print(sorted_file)
+    rp.show_frame(sorted_file, 'Data after arranging data by ', target_col_name, ':')
 
     return sorted_file
 
+
+
+# Requires: column that contains dates should be in type datetime.
+# Modifies: None.
+# Effects: Returns a copy of target_file indexed by a sorted DatetimeIndex built from date_col_name. The date column is
+#          kept as a regular column as well so that functions expecting date_col_name still work on the result.
+def set_time_index(target_file, date_col_name):
+    if target_file[date_col_name].is_monotonic_increasing:
+        indexed_file = target_file.set_index(date_col_name, drop=False)
+    else:
+        indexed_file = target_file.sort_values(by=[date_col_name], kind='mergesort').set_index(date_col_name, drop=False)
+    indexed_file.index.name = None
+
+    return indexed_file
+
+
+
+# Requires: 1st, indexed_file should be the output of set_time_index
+#
+#           2nd, new_batch should have the same columns as indexed_file, with dates in type datetime
+# Modifies: None.
+# Effects: Merges a new batch of rows into indexed_file while keeping the DatetimeIndex sorted. If the batch starts
+#          at or after the last date of indexed_file, it is simply appended. Otherwise the two sorted runs are merged
+#          with a stable mergesort, which is linear for two already sorted runs.
+def merge_sorted_batch(indexed_file, new_batch, date_col_name):
+    new_batch = set_time_index(new_batch, date_col_name)
+
+    if len(new_batch) == 0:
+        return indexed_file
+    if len(indexed_file) == 0 or new_batch.index[0] >= indexed_file.index[-1]:
+        return pd.concat([indexed_file, new_batch])
+
+    merged_file = pd.concat([indexed_file, new_batch])
+    order = np.argsort(merged_file.index.values, kind='mergesort')
+
+    return merged_file.iloc[order]
+
+
+
+# Requires: indexed_file should be the output of set_time_index or merge_sorted_batch.
+# Modifies: None.
+# Effects: Returns rows whose date falls in [start, end] (both inclusive). Bounds are located with a binary search on
+#          the sorted DatetimeIndex, so the cost is O(log n) plus the size of the returned window.
+#          Either bound can be None to leave that side open.
+# Example: slice_time_range(indexed_file, '2025-05-01', '2025-05-31') -> all rows in May 2025
+def slice_time_range(indexed_file, start=None, end=None):
+    index_values = indexed_file.index.values
+
+    if start is None:
+        start_pos = 0
+    else:
+        start_pos = np.searchsorted(index_values, np.datetime64(pd.Timestamp(start)), side='left')
+    if end is None:
+        end_pos = len(index_values)
+    else:
+        end_pos = np.searchsorted(index_values, np.datetime64(pd.Timestamp(end)), side='right')
+
+    return indexed_file.iloc[start_pos:end_pos]
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Resampling data to a regular frequency
+
+# Requires: column that contains dates should be in type datetime.
+# Modifies: None.
+# Effects: Infers a resampling frequency from the median spacing between dates. The largest frequency that is not longer
+#          than the median spacing is returned, so resampling to it never merges typical neighbouring rows.
+# Example: rows that are roughly 5 minutes apart -> 'min', rows that are a few days apart -> 'D'
+def infer_frequency(target_file, date_col_name):
+    freq_ladder = [('MS', pd.Timedelta(days=28)), ('W', pd.Timedelta(days=7)), ('D', pd.Timedelta(days=1)),
+                   ('h', pd.Timedelta(hours=1)), ('min', pd.Timedelta(minutes=1)), ('s', pd.Timedelta(seconds=1))]
+
+    dates = target_file[date_col_name].dropna()
+    if len(dates) >= 3:
+        exact_freq = pd.infer_freq(dates)
+        if exact_freq is not None:
+            return exact_freq
+
+    median_gap = dates.diff().median()
+    if pd.isnull(median_gap):
+        return 'D'
+    for freq, span in freq_ladder:
+        if median_gap >= span:
+            return freq
+
+    return 's'
+
+
+
+# Requires: 1st, column that contains dates should be in type datetime and rows should be sorted by date
+#
+#           2nd, all non-date inputs should be in type int or float
+#
+#           3rd, how should be 'sum', 'mean' or 'ohlc'
+# Modifies: None.
+# Effects: Resamples target_file to a regular frequency so that models receive evenly spaced observations. If freq is
+#          None, it is inferred with infer_frequency. target_file can be a single dataframe, which is processed
+#          chunk_size rows at a time, or any iterable of sorted dataframe chunks (ex: pd.read_csv(..., chunksize=n)).
+#          Rows belonging to the last bin of a chunk are carried over to the next chunk, so every bin is aggregated
+#          exactly once even when it spans a chunk boundary. For 'ohlc', output columns are named <column>_open,
+#          <column>_high, <column>_low and <column>_close. Raises ValueError if a chunk is not sorted by date.
+# Example: resample_data(tick_df, 'Date', freq='D', how='ohlc') -> one row per day with open/high/low/close columns
+def resample_data(target_file, date_col_name, freq=None, how='mean', chunk_size=100000):
+    if how not in ('sum', 'mean', 'ohlc'):
+        raise ValueError('how should be one of sum, mean or ohlc')
+
+    if isinstance(target_file, pd.DataFrame):
+        if freq is None:
+            freq = infer_frequency(target_file, date_col_name)
+        chunks = (target_file.iloc[i:i + chunk_size] for i in range(0, len(target_file), chunk_size))
+    else:
+        if freq is None:
+            raise ValueError('freq must be given when target_file is an iterable of chunks')
+        chunks = target_file
+
+    resampled_list = []
+    carry_over = None
+
+    for chunk in chunks:
+        if carry_over is not None:
+            chunk = pd.concat([carry_over, chunk])
+        if len(chunk) == 0:
+            continue
+        if not chunk[date_col_name].dropna().is_monotonic_increasing:
+            raise ValueError('Rows should be sorted by ' + date_col_name + ' before resampling (see arrange_file)')
+        grouped = chunk.groupby(_bin_grouper(date_col_name, freq))
+        # Holding back the last bin since the next chunk may still contain rows that belong to it
+        group_number = grouped.ngroup().values
+        last_bin = group_number == group_number.max()
+        carry_over = chunk[last_bin]
+        complete = chunk[~last_bin]
+        if len(complete) > 0:
+            resampled_list.append(_aggregate_bins(complete, date_col_name, freq, how))
+
+    if carry_over is not None and len(carry_over) > 0:
+        resampled_list.append(_aggregate_bins(carry_over, date_col_name, freq, how))
+
+    if len(resampled_list) == 0:
+        return pd.DataFrame(columns=[date_col_name])
+
+    resampled_df = pd.concat(resampled_list)
+    # Filling in bins that fell between chunks so the output is evenly spaced
+    full_range = pd.date_range(resampled_df.index[0], resampled_df.index[-1], freq=freq)
+    resampled_df = resampled_df.reindex(full_range, fill_value=0 if how == 'sum' else np.nan)
+    resampled_df.index.name = date_col_name
+    resampled_df.reset_index(inplace=True)
+
+    rp.log('Resampling data...', end='\n')
+    rp.log('Data resampled to frequency ', freq, ' using ', how, ': ', len(resampled_df), ' rows', sep='', end='\n')
+
+    return resampled_df
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns the grouper that splits dates into bins of freq. Fixed-length frequencies (ex: '6h') are anchored at
+#          the epoch so bins line up the same way in every chunk. Calendar frequencies (ex: 'D', 'W', 'MS') already
+#          line up on calendar boundaries, and pandas warns when an origin is given for them.
+def _bin_grouper(date_col_name, freq):
+    if isinstance(pd.tseries.frequencies.to_offset(freq), pd.offsets.Tick):
+        return pd.Grouper(key=date_col_name, freq=freq, origin='epoch')
+
+    return pd.Grouper(key=date_col_name, freq=freq)
+
+
+
+# Requires: rows of target_file should all be complete bins of freq
+# Modifies: None.
+# Effects: Aggregates target_file into bins of freq using how. Helper for resample_data.
+def _aggregate_bins(target_file, date_col_name, freq, how):
+    grouped = target_file.groupby(_bin_grouper(date_col_name, freq))
+
+    if how == 'sum':
+        return grouped.sum()
+    elif how == 'mean':
+        return grouped.mean()
+
+    ohlc_df = grouped.ohlc()
+    ohlc_df.columns = [col + '_' + field for col, field in ohlc_df.columns]
+
+    return ohlc_df.dropna(how='all')
+
 #----------------------------------------------------------------------------------------------------------------------------------------------
 # Normalizing data
 
 # Requires: All non-date inputs should be in type int or float
 # Modifies: target_file.
-# Effects: Normalizes data using min-max scaling
-def normalize_min_max(target_file, date_col_name):
-    from sklearn.preprocessing import MinMaxScaler
+# Effects: Normalizes data using min-max scaling. If inplace is True, columns of target_file are scaled one at a time
+#          and written back into it, keeping its column order and only one scaled column in temporary memory.
+def normalize_min_max(target_file, date_col_name, inplace=False):
+    if inplace:
+        non_date_col_list = target_file.columns.values.tolist()
+        non_date_col_list.remove(date_col_name)
+        for i in non_date_col_list:
+            target_file[i] = kernels.min_max(target_file[i].values)
+        return target_file
 
-    scaler = MinMaxScaler()
     date_col = target_file[date_col_name]
     # Dropping date column before normalizing since it shouldn't be normalized
     target_file = target_file.drop(date_col_name, axis=1)
 
-    target_file = pd.DataFrame(scaler.fit_transform(target_file), columns=target_file.columns)
+    target_file = pd.DataFrame(kernels.min_max(target_file.values), columns=target_file.columns)
     # Inserting back dropped date column before displaying normalized data
     target_file.insert(0, date_col_name, date_col)
 
@@ -588,16 +1181,21 @@ def normalize_min_max(target_file, date_col_name):
 
 # Requires: All non-date inputs should be in type int or float
 # Modifies: target_file.
-# Effects: Normalizes data using Z-score scaling
-def normalize_z_score(target_file, date_col_name):
-    from sklearn.preprocessing import StandardScaler
+# Effects: Normalizes data using Z-score scaling. If inplace is True, columns of target_file are scaled one at a time
+#          and written back into it, keeping its column order and only one scaled column in temporary memory.
+def normalize_z_score(target_file, date_col_name, inplace=False):
+    if inplace:
+        non_date_col_list = target_file.columns.values.tolist()
+        non_date_col_list.remove(date_col_name)
+        for i in non_date_col_list:
+            target_file[i] = kernels.z_score(target_file[i].values)
+        return target_file
 
-    scaler = StandardScaler()
     date_col = target_file[date_col_name]
     # Dropping date column before normalizing since it shouldn't be normalized
     target_file = target_file.drop(date_col_name, axis=1)
 
-    target_file = pd.DataFrame(scaler.fit_transform(target_file), columns=target_file.columns)
+    target_file = pd.DataFrame(kernels.z_score(target_file.values), columns=target_file.columns)
     # Inserting back dropped date column before displaying normalized data
     target_file.insert(0, date_col_name, date_col)
 
@@ -608,7 +1206,8 @@ def normalize_z_score(target_file, date_col_name):
 # Requires: All other columns except for a column that contains data should either be in type float or int.
 # Modifies: target_file.
 # Effects: Normalizes data using one of 2 methods: min-max scaling and Z-score standardization. User can pick the method.
-def normalize_data(target_file, date_col_name):
+#          If inplace is True, target_file is scaled in place one column at a time (see normalize_min_max).
+def normalize_data(target_file, date_col_name, inplace=False):
     print('Normalizing data...', end='\n')
     print('There are 2 methods for normalizing data: min-max scaling and Z-score standardization.', end='\n')
     print('For your reference, normality tests will be conducted to determine if your data is normal or not.', end='\n')
@@ -624,14 +1223,12 @@ def normalize_data(target_file, date_col_name):
         normalize_method_input = normalize_method_input.replace(' ', '').replace('-', '').replace('_', '')
 
         if normalize_method_input == 'minmax':
-            target_file = normalize_min_max(target_file, date_col_name)
-            print('Data after min-max normalization: ', end='\n')
-            print(target_file, end='\n\n')
+            target_file = normalize_min_max(target_file, date_col_name, inplace=inplace)
+            rp.show_frame(target_file, 'Data after min-max normalization: ')
             break
         elif normalize_method_input == 'zscore':
-            target_file = normalize_z_score(target_file, date_col_name)
-            print('Data after Z-score normalization: ', end='\n')
-            print(target_file, end='\n\n')
+            target_file = normalize_z_score(target_file, date_col_name, inplace=inplace)
+            rp.show_frame(target_file, 'Data after Z-score normalization: ')
             break
         else:
             print('Invalid normalization method input. Type again.', end='\n')
@@ -642,34 +1239,102 @@ def normalize_data(target_file, date_col_name):
 # Convert data to be stationary
 
 # Requires: All other columns except for a column that contains data should either be in type float or int.
-# Modifies: target_file.
-# Effects: Makes data stationarity through differencing.
-def convert_stationarity(target_file, date_col_name):
-    print('Converting data to stationarity...', end='\n')
-
+# Modifies: None.
+# Effects: Finds the number of times each non-date column has to be differenced to be stationary, using Augmented
+#          Dickey-Fuller (ADF) test with significance level alpha. Returns a dictionary mapping each column to its order.
+def find_diff_orders(target_file, date_col_name, alpha=0.05):
     from statsmodels.tsa.stattools import adfuller
 
     non_date_col_list = target_file.columns.values.tolist()
     non_date_col_list.remove(date_col_name)
-    station_target_file = []
-    station_df = pd.DataFrame(station_target_file)
-    # Differencing
+    diff_orders = {}
+
     for i in non_date_col_list:
-        temp_data = target_file[i].copy()
+        temp_data = target_file[i].values
         d = 0
         while True:
-            adf_test_result = adfuller(temp_data.dropna(how='all'))
-            if adf_test_result[1] < 0.05: # data is stationarity
+            adf_test_result = adfuller(temp_data[~np.isnan(temp_data)])
+            rp.record_test('ADF', adf_test_result[0], adf_test_result[1], column=i, d=d)
+            if adf_test_result[1] < alpha: # data is stationarity
                 break
             else:
-                temp_data = temp_data.diff()
+                temp_data = kernels.diff(temp_data)
                 d += 1
-        station_df[i] = temp_data.dropna(how='all')
+        diff_orders[i] = d
+
+    return diff_orders
+
+
+
+# Requires: 1st, all other columns except for a column that contains data should either be in type float or int.
+#
+#           2nd, diff_orders should map every non-date column to a number of differences. If it is None, orders are
+#           found with find_diff_orders.
+# Modifies: None.
+# Effects: Differences every non-date column to its own order in one vectorized pass over the columns, then drops the
+#          first max(order) rows so that all columns stay aligned and no other rows are lost. Returns the differenced
+#          data and a transform, which is a dictionary holding the order of each column ('orders') and, for each
+#          column, the last value of the data at every differencing level below its order ('seeds'). The transform
+#          is used by invert_differencing to map forecasts back to the original scale.
+def difference_data(target_file, date_col_name, diff_orders=None):
+    if diff_orders is None:
+        diff_orders = find_diff_orders(target_file, date_col_name)
+
+    non_date_col_list = target_file.columns.values.tolist()
+    non_date_col_list.remove(date_col_name)
+    order_array = np.array([diff_orders[i] for i in non_date_col_list])
+    max_order = order_array.max() if len(order_array) > 0 else 0
+
+    values = target_file[non_date_col_list].values.astype(float)
+    seeds = {i: [] for i in non_date_col_list}
+
+    # Differencing all columns that still need it at level k together
+    for k in range(max_order):
+        col_mask = order_array > k
+        for n in np.flatnonzero(col_mask):
+            seeds[non_date_col_list[n]].append(values[-1, n])
+        values[k + 1:, col_mask] = values[k + 1:, col_mask] - values[k:-1, col_mask]
+
+    station_df = pd.DataFrame(values[max_order:], columns=non_date_col_list)
+    transform = {'orders': dict(diff_orders), 'seeds': seeds}
+
+    return station_df, transform
+
+
+
+# Requires: 1st, forecast should be a dataframe whose columns are differenced columns returned by difference_data,
+#           with rows being consecutive forecasts right after the data that was differenced
+#
+#           2nd, transform should be the transform returned by difference_data
+# Modifies: None.
+# Effects: Maps forecasts of differenced data back to the original scale by cumulatively summing each column once for
+#          every order it was differenced, starting from the stored seed at each level.
+def invert_differencing(forecast, transform):
+    level_forecast = forecast.copy()
+
+    for i in level_forecast.columns:
+        values = level_forecast[i].values.astype(float)
+        for seed in reversed(transform['seeds'][i]):
+            values = seed + np.cumsum(values)
+        level_forecast[i] = values
+
+    return level_forecast
+
+
+
+# Requires: All other columns except for a column that contains data should either be in type float or int.
+# Modifies: None.
+# Effects: Makes data stationarity through differencing (see difference_data). If return_transform is True, the
+#          transform needed to map forecasts back to the original scale is returned together with the data.
+def convert_stationarity(target_file, date_col_name, return_transform=False):
+    print('Converting data to stationarity...', end='\n')
+
+    station_df, transform = difference_data(target_file, date_col_name)
+
+    rp.log('Differencing orders:', transform['orders'], end='\n')
+    rp.show_frame(station_df, 'Data after stationarity conversion:')
 
-    station_df = station_df.dropna(how='all')
-    station_df.reset_index(drop=True, inplace=True)
-    # Removing Nan values that was created as a result of differencing
-    print('Data after stationarity conversion:', end='\n')
-    print(station_df, end='\n\n')
+    if return_transform:
+        return station_df, transform
 
     return station_df
@@ -0,0 +1,277 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import data_analysis as da
+
+# Local forecast service for ARIMA and VAR models saved with data_analysis.save_model.
+# Endpoints:
+#   POST /forecast with body {"model": <model name>, "steps": <number of steps>} -> {"model": ..., "forecast": {...}}
+#   GET /stats -> number of requests served and latency percentiles in milliseconds
+# A model named <model name> is loaded from <model_dir>/<model name>.pkl. Requests arriving within max_wait_ms of each
+# other are coalesced into one micro-batch, where each model is forecast once for the longest horizon requested and
+# every request gets its own slice.
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Loading models
+
+# Requires: service should be the state created by start_service.
+# Modifies: service['models'].
+# Effects: Returns the model named model_name, keeping the max_models most recently used models in memory and loading
+#          others from disk when needed (least recently used cache).
+def _get_model(service, model_name):
+    models = service['models']
+    with service['model_lock']:
+        if model_name in models:
+            models.move_to_end(model_name)
+            return models[model_name]
+
+    # Checking that the name can't point outside of model_dir
+    if os.path.basename(model_name) != model_name or model_name in ('', '.', '..'):
+        raise KeyError(model_name)
+    file_name = os.path.join(service['model_dir'], model_name + '.pkl')
+    if not os.path.isfile(file_name):
+        raise KeyError(model_name)
+    model_result = da.load_model(file_name)
+
+    with service['model_lock']:
+        models[model_name] = model_result
+        models.move_to_end(model_name)
+        while len(models) > service['max_models']:
+            models.popitem(last=False)
+
+    return model_result
+
+
+
+# Requires: model_result should be a fitted result returned by data_analysis.arima or data_analysis.var.
+# Modifies: None.
+# Effects: Forecasts steps ahead and returns a dictionary mapping each variable to a list of forecasts.
+def _forecast(model_result, steps):
+    if hasattr(model_result, 'k_ar'):
+        predictions = model_result.forecast(y=model_result.endog[-model_result.k_ar:], steps=steps)
+        return {str(name): predictions[:, n].tolist() for n, name in enumerate(model_result.names)}
+
+    predictions = np.asarray(model_result.forecast(steps=steps))
+    name = getattr(model_result.model, 'endog_names', 'forecast')
+
+    return {str(name): predictions.tolist()}
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Micro-batching
+
+# Requires: service should be the state created by start_service.
+# Modifies: service.
+# Effects: Runs until the service is stopped. Takes pending requests, waiting up to max_wait_ms after the first one to
+#          collect at most max_batch requests, then answers all of them, forecasting each model only once per batch.
+def _batch_loop(service):
+    pending = service['pending']
+
+    while not service['stop'].is_set():
+        try:
+            batch = [pending.get(timeout=0.1)]
+        except queue.Empty:
+            continue
+        deadline = time.perf_counter() + service['max_wait_ms'] / 1000
+        while len(batch) < service['max_batch']:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        # Grouping requests by model so that each model is forecast once for the longest horizon
+        request_group = {}
+        for request in batch:
+            request_group.setdefault(request['model'], []).append(request)
+
+        for model_name, request_list in request_group.items():
+            try:
+                model_result = _get_model(service, model_name)
+                forecast = _forecast(model_result, max(request['steps'] for request in request_list))
+            except KeyError:
+                for request in request_list:
+                    request['error'] = (404, 'Unknown model: ' + model_name)
+            except Exception as error:
+                for request in request_list:
+                    request['error'] = (500, str(error))
+            else:
+                for request in request_list:
+                    request['forecast'] = {name: values[:request['steps']] for name, values in forecast.items()}
+            for request in request_list:
+                request['done'].set()
+
+        service['batch_sizes'].append(len(batch))
+
+
+
+# Requires: service should be the state created by start_service.
+# Modifies: service.
+# Effects: Queues a forecast request, waits until its batch is answered and records its latency. Returns the forecast
+#          dictionary. Raises LookupError if the model is unknown, TimeoutError if the request is not answered within
+#          request_timeout seconds, and RuntimeError if forecasting failed or the service was stopped.
+def request_forecast(service, model_name, steps):
+    if service['stop'].is_set():
+        raise RuntimeError('Service is stopped')
+
+    start = time.perf_counter()
+    request = {'model': model_name, 'steps': steps, 'done': threading.Event()}
+    service['pending'].put(request)
+    if not request['done'].wait(service['request_timeout']):
+        raise TimeoutError('Forecast was not ready within ' + str(service['request_timeout']) + ' seconds')
+
+    with service['stats_lock']:
+        service['latencies'].append((time.perf_counter() - start) * 1000)
+        service['n_requests'] += 1
+
+    if 'error' in request:
+        status, message = request['error']
+        raise LookupError(message) if status == 404 else RuntimeError(message)
+
+    return request['forecast']
+
+
+
+# Requires: service should be the state created by start_service.
+# Modifies: service['pending'].
+# Effects: Answers every request still waiting in the queue with an error, so that no caller waits on a stopped service.
+def _fail_pending(service):
+    while True:
+        try:
+            request = service['pending'].get_nowait()
+        except queue.Empty:
+            return
+        request['error'] = (503, 'Service is stopped')
+        request['done'].set()
+
+
+
+# Requires: service should be the state created by start_service.
+# Modifies: None.
+# Effects: Returns the number of requests served, the average batch size and the 50th, 90th and 99th percentile of
+#          request latency in milliseconds over the most recent requests.
+def service_stats(service):
+    with service['stats_lock']:
+        latencies = np.array(service['latencies'])
+        n_requests = service['n_requests']
+    batch_sizes = list(service['batch_sizes'])
+
+    stats = {'requests': n_requests, 'mean_batch_size': float(np.mean(batch_sizes)) if batch_sizes else 0.0}
+    for percentile in (50, 90, 99):
+        stats['p' + str(percentile) + '_ms'] = float(np.percentile(latencies, percentile)) if len(latencies) else None
+
+    return stats
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# HTTP server
+
+class _ForecastServer(ThreadingHTTPServer):
+    # Allowing more connections to wait for accept() than the default of 5, so bursts of clients aren't refused
+    request_queue_size = 128
+    daemon_threads = True
+
+
+
+class _ForecastHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._send_json(200, service_stats(self.server.service))
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/forecast':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            model_name = str(body['model'])
+            steps = int(body['steps'])
+            if steps < 1:
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'Body should be {"model": <name>, "steps": <positive integer>}'})
+            return
+
+        try:
+            forecast = request_forecast(self.server.service, model_name, steps)
+        except LookupError as error:
+            self._send_json(404, {'error': str(error)})
+        except TimeoutError as error:
+            self._send_json(504, {'error': str(error)})
+        except RuntimeError as error:
+            self._send_json(503 if self.server.service['stop'].is_set() else 500, {'error': str(error)})
+        else:
+            self._send_json(200, {'model': model_name, 'forecast': forecast})
+
+    def log_message(self, format, *args):
+        # Keeping the console quiet, latency is reported through /stats instead
+        pass
+
+
+
+# Requires: model_dir should be a folder of models saved with data_analysis.save_model as <model name>.pkl.
+# Modifies: None.
+# Effects: Starts the forecast service on host and port in background threads and returns the server. Use port 0 to
+#          pick a free port; the port in use is server.server_address[1]. max_models models are kept in memory,
+#          and each micro-batch waits up to max_wait_ms for at most max_batch requests. A request that isn't answered
+#          within request_timeout seconds fails with status 504. Latency percentiles are taken over the last
+#          latency_window requests.
+# Example: server = start_service('models'); POST http://127.0.0.1:<port>/forecast {"model": "euro_arima", "steps": 5}
+def start_service(model_dir, host='127.0.0.1', port=0, max_models=32, max_batch=64, max_wait_ms=5,
+                  latency_window=10000, request_timeout=30):
+    service = {
+        'model_dir': model_dir,
+        'models': OrderedDict(),
+        'model_lock': threading.Lock(),
+        'max_models': max_models,
+        'pending': queue.Queue(),
+        'max_batch': max_batch,
+        'max_wait_ms': max_wait_ms,
+        'request_timeout': request_timeout,
+        'stop': threading.Event(),
+        'latencies': deque(maxlen=latency_window),
+        'batch_sizes': deque(maxlen=latency_window),
+        'n_requests': 0,
+        'stats_lock': threading.Lock(),
+    }
+
+    server = _ForecastServer((host, port), _ForecastHandler)
+    server.service = service
+    service['threads'] = [threading.Thread(target=_batch_loop, args=(service,), daemon=True),
+                          threading.Thread(target=server.serve_forever, daemon=True)]
+    for thread in service['threads']:
+        thread.start()
+
+    return server
+
+
+
+# Requires: server should be returned by start_service.
+# Modifies: server.
+# Effects: Stops the forecast service and closes its socket. Requests still waiting in the queue are answered with an
+#          error right away, and the batch being forecast is finished before returning.
+def stop_service(server):
+    service = server.service
+    service['stop'].set()
+    server.shutdown()
+    server.server_close()
+    _fail_pending(service)
+    for thread in service['threads']:
+        thread.join()
+    # Answering requests queued while the last batch was running
+    _fail_pending(service)
@@ -0,0 +1,182 @@
+import numpy as np
+
+# Numeric kernels used by data_clean.py and data_analysis.py.
+# The default backend uses NumPy only. If Numba is installed, set_backend('numba') switches to JIT-compiled versions of
+# the same kernels. Both backends take and return NumPy arrays of type float.
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# NumPy backend
+
+def _numpy_mahalanobis(data, mean, inverse_cov):
+    centered = data - mean
+
+    return np.sqrt(np.einsum('ij,jk,ik->i', centered, inverse_cov, centered))
+
+
+
+def _numpy_diff(values, order):
+    result = values.copy()
+    for _ in range(order):
+        result[1:] = result[1:] - result[:-1]
+    # Matching pandas, where the first order entries become missing
+    result[:order] = np.nan
+
+    return result
+
+
+
+def _numpy_scale(values, shift, scale):
+    return (values - shift) / scale
+
+
+
+_numpy_kernels = {'mahalanobis': _numpy_mahalanobis, 'diff': _numpy_diff, 'scale': _numpy_scale}
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Numba backend
+
+# Requires: Numba should be installed.
+# Modifies: None.
+# Effects: Compiles and returns the Numba versions of the kernels. Imported here so Numba stays an optional dependency.
+def _build_numba_kernels():
+    import numba
+
+    @numba.njit
+    def numba_mahalanobis(data, mean, inverse_cov):
+        n_row, n_col = data.shape
+        m_dist = np.empty(n_row)
+        centered = np.empty(n_col)
+        for i in range(n_row):
+            for j in range(n_col):
+                centered[j] = data[i, j] - mean[j]
+            total = 0.0
+            for j in range(n_col):
+                row_total = 0.0
+                for k in range(n_col):
+                    row_total += inverse_cov[j, k] * centered[k]
+                total += centered[j] * row_total
+            m_dist[i] = np.sqrt(total)
+        return m_dist
+
+    @numba.njit
+    def numba_diff(values, order):
+        result = values.copy()
+        for _ in range(order):
+            for i in range(len(result) - 1, 0, -1):
+                result[i] = result[i] - result[i - 1]
+        for i in range(min(order, len(result))):
+            result[i] = np.nan
+        return result
+
+    @numba.njit
+    def numba_scale(values, shift, scale):
+        n_row, n_col = values.shape
+        result = np.empty((n_row, n_col))
+        for i in range(n_row):
+            for j in range(n_col):
+                result[i, j] = (values[i, j] - shift[j]) / scale[j]
+        return result
+
+    return {'mahalanobis': numba_mahalanobis, 'diff': numba_diff, 'scale': numba_scale}
+
+
+
+_backend = {'name': 'numpy', 'kernels': _numpy_kernels, 'numba_kernels': None}
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Choosing backend
+
+# Requires: name should be 'numpy' or 'numba'. Numba should be installed for 'numba'.
+# Modifies: Backend used by all kernels in this file.
+# Effects: Selects the backend used by the kernels below. Numba kernels are compiled on their first call and kept for
+#          later switches.
+def set_backend(name):
+    if name == 'numpy':
+        _backend['kernels'] = _numpy_kernels
+    elif name == 'numba':
+        if _backend['numba_kernels'] is None:
+            try:
+                _backend['numba_kernels'] = _build_numba_kernels()
+            except ImportError:
+                raise ImportError('Numba is not installed. Install numba or use the numpy backend.')
+        _backend['kernels'] = _backend['numba_kernels']
+    else:
+        raise ValueError('Backend should be numpy or numba')
+    _backend['name'] = name
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns the name of the backend in use.
+def get_backend():
+    return _backend['name']
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Kernels
+
+# Requires: 1st, data should be a matrix with real number entries
+#
+#           2nd, mean should be a vector and inverse_cov should be a square matrix, both matching columns of data
+# Modifies: None.
+# Effects: Calculates Mahalanobis distance of every row of data.
+def mahalanobis(data, mean, inverse_cov):
+    data = np.ascontiguousarray(data, dtype=float)
+    if data.ndim == 1:
+        data = data.reshape(1, -1)
+
+    return _backend['kernels']['mahalanobis'](data, np.asarray(mean, dtype=float),
+                                              np.ascontiguousarray(inverse_cov, dtype=float))
+
+
+
+# Requires: values should be a vector with real number entries and order >= 0.
+# Modifies: None.
+# Effects: Differences values order times. The output has the same length as values, and its first order entries are
+#          missing, the same as applying pandas diff() order times.
+def diff(values, order=1):
+    return _backend['kernels']['diff'](np.array(values, dtype=float), order)
+
+
+
+# Requires: values should be a matrix (or vector) with real number entries.
+# Modifies: None.
+# Effects: Standardizes every column of values using Z-score scaling. mean and std default to the column mean and
+#          population standard deviation of values, and can be given to scale new data with existing statistics.
+#          Columns with standard deviation of 0 are only centered.
+def z_score(values, mean=None, std=None):
+    values, is_vector = _as_matrix(values)
+    if mean is None:
+        mean = values.mean(axis=0)
+    if std is None:
+        std = values.std(axis=0)
+    std = np.where(np.asarray(std, dtype=float) == 0, 1, std)
+
+    result = _backend['kernels']['scale'](values, np.asarray(mean, dtype=float), std)
+
+    return result[:, 0] if is_vector else result
+
+
+
+# Requires: values should be a matrix (or vector) with real number entries.
+# Modifies: None.
+# Effects: Scales every column of values into [0, 1] using min-max scaling. Constant columns become 0, the same as
+#          sklearn's MinMaxScaler.
+def min_max(values):
+    values, is_vector = _as_matrix(values)
+    col_min = values.min(axis=0)
+    col_range = values.max(axis=0) - col_min
+    col_range = np.where(col_range == 0, 1, col_range)
+
+    result = _backend['kernels']['scale'](values, col_min, col_range)
+
+    return result[:, 0] if is_vector else result
+
+
+
+def _as_matrix(values):
+    values = np.ascontiguousarray(values, dtype=float)
+    if values.ndim == 1:
+        return values.reshape(-1, 1), True
+
+    return values, False
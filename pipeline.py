@@ -0,0 +1,85 @@
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import data_clean as dc
+import report as rp
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Reading files
+
+# Requires: file_name should be a path to a csv file.
+# Modifies: None.
+# Effects: Reads file_name, trying utf-8, latin-1 and cp1252 encodings in that order.
+def read_file(file_name):
+    try:
+        return pd.read_csv(file_name, encoding='utf-8')
+    except UnicodeDecodeError:
+        try:
+            return pd.read_csv(file_name, encoding='latin-1')
+        except UnicodeDecodeError:
+            return pd.read_csv(file_name, encoding='cp1252')
+
+
+
+# Requires: file_name should be a path to a csv file in the format expected by data_clean.convert_input.
+# Modifies: None.
+# Effects: Reads file_name and converts its entries with data_clean.convert_input.
+def read_and_convert(file_name, date_col_name):
+    return dc.convert_input(read_file(file_name), date_col_name)
+
+# -----------------------------------------------------------------------------------------------------------------------------
+# Prefetching and processing files
+
+# Requires: None.
+# Modifies: None.
+# Effects: Yields (file name, converted data) for every file in file_name_list, in order. Files are read and converted
+#          by n_readers reader threads ahead of time, so the next files are already loaded while the caller is still
+#          working on the current one. At most max_prefetch files are read ahead, which bounds memory: a new read is
+#          only started once the caller takes a file. Reading and parsing release the GIL for most of their work, so
+#          threads are enough to overlap them with compute.
+def prefetch_files(file_name_list, date_col_name, n_readers=2, max_prefetch=2):
+    file_name_iter = iter(file_name_list)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=n_readers) as executor:
+        # Starting the first reads
+        for file_name in file_name_iter:
+            pending.append((file_name, executor.submit(read_and_convert, file_name, date_col_name)))
+            if len(pending) >= max_prefetch:
+                break
+
+        while pending:
+            file_name, future = pending.popleft()
+            target_file = future.result()
+            # Starting the next read before handing the current file to the caller
+            next_file_name = next(file_name_iter, None)
+            if next_file_name is not None:
+                pending.append((next_file_name, executor.submit(read_and_convert, next_file_name, date_col_name)))
+            yield file_name, target_file
+
+
+
+# Requires: process_file should take converted data (see data_clean.convert_input) and its file name, and clean and
+#           analyze it without asking the user (ex: using check_for_missing with impute_method and check_duplicates
+#           with date_dup_policy).
+# Modifies: None.
+# Effects: Runs process_file on every file in file_name_list while upcoming files are prefetched by prefetch_files, and
+#          records the time spent on each file in the active report. Returns a dictionary mapping each file name to
+#          the result of process_file.
+def run_pipeline(file_name_list, process_file, date_col_name, n_readers=2, max_prefetch=2):
+    import time
+
+    results = {}
+    wait_start = time.perf_counter()
+
+    for file_name, target_file in prefetch_files(file_name_list, date_col_name, n_readers, max_prefetch):
+        process_start = time.perf_counter()
+        rp.log('Processing ', file_name, ' (waited ', round(process_start - wait_start, 3), 's for data)', sep='', end='\n')
+
+        results[file_name] = process_file(target_file, file_name)
+
+        wait_start = time.perf_counter()
+        rows_after = len(results[file_name]) if isinstance(results[file_name], pd.DataFrame) else len(target_file)
+        rp.record_stage('process ' + str(file_name), wait_start - process_start, len(target_file), rows_after)
+
+    return results
@@ -0,0 +1,168 @@
+import json
+import math
+import time
+
+# Run report collected through the cleaning and analysis functions.
+# start_report() makes a new report active. While a report is active, functions in data_clean.py, data_analysis.py and
+# utility_functions.py record stage timings, row counts, test results, model orders and forecasts into it, and
+# report_to_json() writes it out as JSON. Full data frames are only printed at verbosity 2 or more.
+
+_active = {'report': None, 'verbosity': 2}
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Starting report and controlling printing
+
+# Requires: verbosity should be 0 (only prompts and progress messages), 1 (also results, but no full data) or 2
+#           (everything, including full data after every step and model summaries). Before any report is started,
+#           verbosity is 2.
+# Modifies: Active report and verbosity.
+# Effects: Starts a new empty report, makes it active and returns it.
+def start_report(verbosity=1):
+    report = {'stages': [], 'tests': [], 'models': [], 'forecasts': []}
+    _active['report'] = report
+    _active['verbosity'] = verbosity
+
+    return report
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns the active report, or None if no report has been started.
+def get_report():
+    return _active['report']
+
+
+
+# Requires: level should be 0, 1 or 2 (see start_report).
+# Modifies: None.
+# Effects: Prints values the same way print does, only if the verbosity is at least level.
+def log(*values, level=1, **kwargs):
+    if _active['verbosity'] >= level:
+        print(*values, **kwargs)
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Prints header and the full target_file only if the verbosity is 2 or more. Formatting a large data frame is
+#          slow, so batch runs should use a lower verbosity.
+def show_frame(target_file, *header):
+    if _active['verbosity'] >= 2:
+        if header:
+            print(*header, sep='', end='\n')
+        print(target_file, end='\n\n')
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Recording into report
+
+# Requires: func should take target_file as its first argument and return a data frame.
+# Modifies: Active report.
+# Effects: Runs func(target_file, *args, **kwargs) and records, under name, how long it took and how many rows it
+#          removed. Returns the result of func.
+# Example: euro_file_df = run_stage('arrange_file', dc.arrange_file, euro_file_df, 'Date')
+def run_stage(name, func, target_file, *args, **kwargs):
+    rows_before = len(target_file)
+    start = time.perf_counter()
+    result = func(target_file, *args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    rows_after = len(result[0]) if isinstance(result, tuple) else len(result)
+    record_stage(name, seconds, rows_before, rows_after)
+
+    return result
+
+
+
+# Requires: None.
+# Modifies: Active report.
+# Effects: Records the run time and row counts of a stage if a report is active.
+def record_stage(name, seconds, rows_before, rows_after):
+    if _active['report'] is not None:
+        _active['report']['stages'].append({'stage': name, 'seconds': seconds, 'rows_before': rows_before,
+                                            'rows_after': rows_after, 'rows_removed': rows_before - rows_after})
+
+
+
+# Requires: None.
+# Modifies: Active report.
+# Effects: Records the statistic and p-value of a statistical test if a report is active. Other details (ex: which
+#          column was tested) can be given as keyword arguments.
+def record_test(name, statistic, p_value, **details):
+    if _active['report'] is not None:
+        test = {'test': name, 'statistic': statistic, 'p_value': p_value}
+        test.update(details)
+        _active['report']['tests'].append(test)
+
+
+
+# Requires: None.
+# Modifies: Active report.
+# Effects: Records the chosen order of a model if a report is active.
+def record_model(name, order, **details):
+    if _active['report'] is not None:
+        model = {'model': name, 'order': order}
+        model.update(details)
+        _active['report']['models'].append(model)
+
+
+
+# Requires: forecast should be a series or a data frame.
+# Modifies: Active report.
+# Effects: Records forecasts of a model if a report is active. Each forecast is stored as a dictionary mapping a
+#          column (the series name for a series) to a list of forecast values, along with the forecast index.
+def record_forecast(name, forecast):
+    if _active['report'] is not None:
+        forecast_frame = forecast.to_frame() if hasattr(forecast, 'to_frame') else forecast
+        _active['report']['forecasts'].append({
+            'model': name,
+            'index': [str(i) for i in forecast_frame.index],
+            'values': {str(col): forecast_frame[col].tolist() for col in forecast_frame.columns},
+        })
+
+#----------------------------------------------------------------------------------------------------------------------------------------------
+# Writing report
+
+# Requires: None.
+# Modifies: None.
+# Effects: Converts NumPy and pandas values that json can't write into plain Python values.
+def _to_json_value(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+
+    return str(value)
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns a copy of value with every NaN or infinite number (ex: a missing forecast) replaced by None, since
+#          NaN and Infinity are not valid JSON.
+def _replace_non_finite(value):
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(item) for item in value]
+    if hasattr(value, 'tolist') and not isinstance(value, str):
+        return _replace_non_finite(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    return value
+
+
+
+# Requires: report should be a report returned by start_report. If it is None, the active report is used.
+# Modifies: None.
+# Effects: Returns report as a JSON string. If file_name is given, the JSON is also written to that file.
+def report_to_json(report=None, file_name=None):
+    if report is None:
+        report = _active['report']
+
+    report_json = json.dumps(_replace_non_finite(report), default=_to_json_value, indent=2, allow_nan=False)
+
+    if file_name is not None:
+        with open(file_name, 'w') as report_file:
+            report_file.write(report_json)
+
+    return report_json
@@ -1,8 +1,12 @@
-import pandas as pd
 import numpy as np
 import utility_functions as uf
 import data_clean as dc
 import data_analysis as da
+import report as rp
+import pipeline as pl
+
+# Collecting a run report. Verbosity 2 prints full data after every step; use 0 or 1 for batch runs.
+rp.start_report(verbosity=2)
 
 # Cleaning data
 
@@ -14,13 +18,7 @@ print('Cleaning euro file:', end='\n')
 # Importing file
 euro_file_name = '/Users/joshpaik/Downloads/TS_sample_data_euro(Sheet1)-4.csv'
 
-try:
-    euro_file = pd.read_csv(euro_file_name, encoding='utf-8')
-except UnicodeDecodeError:
-    try:
-        euro_file = pd.read_csv(euro_file_name, encoding='latin-1')
-    except UnicodeDecodeError:
-        euro_file = pd.read_csv(euro_file_name, encoding='cp1252')
+euro_file = pl.read_file(euro_file_name)
 
 print('Original data: ', end='\n')
 print(euro_file, end='\n\n')
@@ -29,18 +27,18 @@ euro_file_df = dc.convert_input(target_file=euro_file, date_col_name='Date') # n
 print('Euro file after converting entries data type: ', end='\n')                 # target_file into dataframe
 print(euro_file_df, end='\n\n')
 
-euro_file_df = dc.check_for_missing(target_file=euro_file_df)
+euro_file_df = rp.run_stage('check_for_missing', dc.check_for_missing, euro_file_df)
 
-euro_file_df = dc.check_duplicates(target_file=euro_file_df, date_col_name='Date')
+euro_file_df = rp.run_stage('check_duplicates', dc.check_duplicates, euro_file_df, date_col_name='Date')
 print('')
 
-euro_file_df = dc.check_outliers(target_file=euro_file_df, date_col_name='Date')
+euro_file_df = rp.run_stage('check_outliers', dc.check_outliers, euro_file_df, date_col_name='Date')
 print('')
 
-euro_file_df = dc.arrange_file(target_file=euro_file_df, target_col_name='Date')
+euro_file_df = rp.run_stage('arrange_file', dc.arrange_file, euro_file_df, target_col_name='Date', inplace=True)
 print('')
 
-euro_file_df = dc.normalize_data(target_file=euro_file_df, date_col_name='Date')
+euro_file_df = rp.run_stage('normalize_data', dc.normalize_data, euro_file_df, date_col_name='Date', inplace=True)
 print('')
 print('')
 
@@ -55,6 +53,9 @@ print('')
 # Forcasting measures on euro_file
 da.arima(euro_file_df, 'Revenue',10)
 
-euro_file_station = dc.convert_stationarity(euro_file_df, 'Date')
+euro_file_station, euro_file_transform = dc.convert_stationarity(euro_file_df, 'Date', return_transform=True)
+
+da.var(euro_file_station, 10, transform=euro_file_transform)
 
-da.var(euro_file_station, 10)
+# Saving run report
+rp.report_to_json(file_name='euro_file_report.json')
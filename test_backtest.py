@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('statsmodels')
+import backtest as bt
+
+
+
+def test_var_backtest_does_not_depend_on_n_workers():
+    rng = np.random.default_rng(0)
+    values = np.zeros((80, 2))
+    for t in range(1, 80):
+        values[t] = 0.5 * values[t - 1] + rng.normal(size=2)
+    target_file = pd.DataFrame(values, columns=['Revenue', 'Cost'])
+
+    one_worker = bt.backtest(target_file, 'var', horizon=2, initial_window=40, n_workers=1)
+    four_workers = bt.backtest(target_file, 'var', horizon=2, initial_window=40, n_workers=4)
+
+    pd.testing.assert_frame_equal(one_worker, four_workers)
@@ -0,0 +1,55 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('statsmodels')
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.arima_process import arma_generate_sample
+import batch_forecast as bf
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns n_series simulated ARIMA series of length n_obs as columns of a dataframe, with AR and MA
+#          coefficients ar and ma and integrated d times.
+def _simulated_file(ar, ma, d, n_series, n_obs, seed=0):
+    rng = np.random.default_rng(seed)
+    series_dict = {}
+    for n in range(n_series):
+        y = arma_generate_sample(np.r_[1, -np.array(ar)], np.r_[1, np.array(ma)], n_obs + d, burnin=50,
+                                 distrvs=rng.standard_normal)
+        for _ in range(d):
+            y = np.cumsum(y)
+        series_dict['series_' + str(n)] = y[d:] + 10 * (d == 0)
+
+    return pd.DataFrame(series_dict)
+
+
+
+@pytest.mark.parametrize('order, ar, ma, n_obs', [
+    ((1, 0, 0), [0.6], [], 60),
+    ((1, 0, 1), [0.5], [0.3], 80),
+    ((0, 1, 1), [], [0.4], 60),
+    ((2, 0, 0), [0.5, -0.3], [], 60),
+    ((1, 0, 0), [0.6], [], 12),
+])
+def test_batch_arima_matches_statsmodels(order, ar, ma, n_obs):
+    target_file = _simulated_file(ar, ma, order[1], 4, n_obs)
+
+    forecast_df, params_df = bf.batch_arima(target_file, order, steps=3)
+
+    assert forecast_df.shape == (3, 4)
+    assert forecast_df.index.tolist() == [n_obs, n_obs + 1, n_obs + 2]
+    param_col_list = [i for i in params_df.columns if i.startswith(('ar.', 'ma.'))]
+    for series_name in target_file.columns:
+        # batch_arima removes the sample mean when d is 0, so statsmodels is fitted the same way
+        y = target_file[series_name].values
+        mean = y.mean() if order[1] == 0 else 0
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = ARIMA(y - mean, order=order, trend='n').fit()
+        expected_params = [result.params[result.param_names.index(i)] for i in param_col_list]
+
+        assert np.allclose(params_df.loc[series_name, param_col_list], expected_params, atol=0.01)
+        assert np.allclose(forecast_df[series_name], result.forecast(3) + mean, atol=0.05)
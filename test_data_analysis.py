@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('statsmodels')
+import matplotlib
+matplotlib.use('Agg')
+import statsmodels.graphics.tsaplots as tsaplots
+import utility_functions as uf
+import data_analysis as da
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns a stationary AR(1) series of length n_obs named 'Revenue', the same shape arima() receives from
+#          a cleaned file.
+def _ar_file(n_obs, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.zeros(n_obs)
+    for t in range(1, n_obs):
+        values[t] = 0.5 * values[t - 1] + rng.normal()
+
+    return pd.DataFrame({'Revenue': values})
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Fits arima() without plots or user input, choosing p = 1 and q = 0.
+def _fit_arima(monkeypatch, target_file, steps):
+    monkeypatch.setattr(uf, 'input_indices', lambda: [1, 0])
+    monkeypatch.setattr(da.plt, 'show', lambda: None)
+    monkeypatch.setattr(tsaplots, 'plot_acf', lambda *args, **kwargs: None)
+    monkeypatch.setattr(tsaplots, 'plot_pacf', lambda *args, **kwargs: None)
+
+    return da.arima(target_file, 'Revenue', steps)
+
+
+
+def test_update_arima_accepts_arima_output(monkeypatch):
+    target_file = _ar_file(80)
+    arima_result = _fit_arima(monkeypatch, target_file.iloc[:70], 5)
+
+    updated_result, forecast = da.update_arima(arima_result, target_file['Revenue'].values[70:], 5,
+                                                  drift_threshold=np.inf)
+
+    assert updated_result.nobs == 80
+    assert len(forecast) == 5
+    assert np.allclose(updated_result.params, arima_result.params)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+import data_clean as dc
+import utility_functions as uf
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns n_rows rows of Gaussian data in n_cols columns with a daily 'Date' column in front.
+def _gaussian_file(n_rows, n_cols, seed=0):
+    rng = np.random.default_rng(seed)
+    target_file = pd.DataFrame(rng.normal(size=(n_rows, n_cols)), columns=['x' + str(i) for i in range(n_cols)])
+    target_file.insert(0, 'Date', pd.date_range('2025-01-01', periods=n_rows, freq='D'))
+
+    return target_file
+
+
+
+def test_remove_mahalanobis_outliers_removes_planted_outliers():
+    target_file = _gaussian_file(2000, 4)
+    target_file.iloc[:5, 1:] = 8.0
+
+    cleaned_file = dc.remove_mahalanobis_outliers(target_file, 'Date', alpha=0.001, max_rounds=1)
+
+    assert not (cleaned_file.iloc[:, 1:] == 8.0).all(axis=1).any()
+    assert len(cleaned_file) < len(target_file) - 4
+
+
+
+def test_outlier_sweep_mahalanobis_threshold_is_a_distance():
+    target_file = _gaussian_file(2000, 4, seed=1)
+    target_file.iloc[:5, 1:] = 8.0
+
+    flags, scores = dc.outlier_sweep(target_file, 'Date', alpha=0.05)
+    m_threshold = scores.attrs['mahalanobis_threshold']
+
+    assert np.isclose(m_threshold ** 2, stats.chi2.ppf(0.95, 4))
+    assert flags['mahalanobis'].equals(scores['Mahalanobis distance'] > m_threshold)
+    assert flags['mahalanobis'].iloc[:5].all()
+    # Roughly alpha of the Gaussian rows should be flagged
+    assert 0.02 < flags['mahalanobis'].iloc[5:].mean() < 0.1
+
+
+
+def test_impute_missing_time_passes_nat_rows_through():
+    target_file = pd.DataFrame({
+        'Date': pd.to_datetime(['2025-01-01', '2025-01-02', None, '2025-01-04', '2025-01-08']),
+        'Rate': [1.0, np.nan, np.nan, np.nan, 5.0],
+    })
+
+    imputed_file = dc.impute_missing(target_file, 'Date', method='time', chunk_size=2)
+
+    assert imputed_file['Date'].isnull().tolist() == [False, False, True, False, False]
+    assert np.allclose(imputed_file['Rate'].iloc[[0, 1, 3, 4]], [1.0, 1 + 4 / 7, 1 + 12 / 7, 5.0])
+    assert np.isnan(imputed_file['Rate'].iloc[2])
+
+
+
+def test_check_for_missing_requires_date_col_name_for_imputation():
+    with pytest.raises(ValueError, match='date_col_name'):
+        dc.check_for_missing(_gaussian_file(10, 2), impute_method='linear')
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns Gaussian data as in _gaussian_file, with rows shuffled so that dates are out of order.
+def _shuffled_file(n_rows, n_cols, seed=0):
+    target_file = _gaussian_file(n_rows, n_cols, seed)
+
+    return target_file.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+
+def test_arrange_file_inplace_matches_sort_and_saves_memory():
+    expected_file = _gaussian_file(200000, 5)
+    copy_file, copy_ratio = uf.peak_memory_ratio(dc.arrange_file, _shuffled_file(200000, 5), 'Date')
+    inplace_file, inplace_ratio = uf.peak_memory_ratio(dc.arrange_file, _shuffled_file(200000, 5), 'Date', inplace=True)
+
+    pd.testing.assert_frame_equal(copy_file, expected_file)
+    pd.testing.assert_frame_equal(inplace_file, expected_file)
+    assert inplace_ratio < 1.4
+    assert inplace_ratio < copy_ratio
+
+
+
+@pytest.mark.parametrize('normalize', [dc.normalize_min_max, dc.normalize_z_score])
+def test_normalize_inplace_matches_copy_and_saves_memory(normalize):
+    copy_file, copy_ratio = uf.peak_memory_ratio(normalize, _gaussian_file(200000, 5), 'Date')
+    target_file = _gaussian_file(200000, 5)
+    inplace_file, inplace_ratio = uf.peak_memory_ratio(normalize, target_file, 'Date', inplace=True)
+
+    assert inplace_file is target_file
+    pd.testing.assert_frame_equal(inplace_file, copy_file)
+    assert inplace_ratio < 1.2
+    assert copy_ratio < 3
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns a small file with a missing date, a pair of rows sharing a date and a group whose Profit is all
+#          missing, with the date column not in front.
+def _date_duplicate_file():
+    return pd.DataFrame({
+        'Revenue': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'Date': pd.to_datetime(['2025-01-02', '2025-01-01', None, '2025-01-02', '2025-01-03']),
+        'Profit': [np.nan, 1.0, 2.0, np.nan, 3.0],
+    })
+
+
+
+@pytest.mark.parametrize('how, expected_revenue, expected_profit', [
+    ('sum', [5.0, 2.0, 3.0, 5.0], [np.nan, 1.0, 2.0, 3.0]),
+    ('mean', [2.5, 2.0, 3.0, 5.0], [np.nan, 1.0, 2.0, 3.0]),
+    ('first', [1.0, 2.0, 3.0, 5.0], [np.nan, 1.0, 2.0, 3.0]),
+    ('last', [4.0, 2.0, 3.0, 5.0], [np.nan, 1.0, 2.0, 3.0]),
+])
+def test_collapse_date_duplicates_keeps_missing_dates(how, expected_revenue, expected_profit):
+    collapsed_file, n_merged = dc.collapse_date_duplicates(_date_duplicate_file(), 'Date', how)
+
+    assert n_merged == 1
+    assert collapsed_file.columns.tolist() == ['Revenue', 'Date', 'Profit']
+    assert collapsed_file['Date'].isnull().tolist() == [False, False, True, False]
+    assert collapsed_file['Date'].iloc[0] == pd.Timestamp('2025-01-02')
+    assert np.allclose(collapsed_file['Revenue'], expected_revenue)
+    assert np.allclose(collapsed_file['Profit'], expected_profit, equal_nan=True)
+
+
+
+def test_parse_dates_all_missing():
+    parsed_series, unparsed = dc.parse_dates(pd.Series([np.nan, np.nan]))
+
+    assert parsed_series.isnull().all()
+    assert not unparsed.any()
+
+
+
+def test_parse_dates_does_not_mix_month_first_and_day_first():
+    date_series = pd.Series(['02/01/2025', '12/01/2025', '13/01/2025', '2025-01-14'])
+
+    # The sample only holds dates that read as month-first, so day-first strings are reported instead of mixed in
+    parsed_series, unparsed = dc.parse_dates(date_series, sample_size=2)
+    assert parsed_series.iloc[:2].tolist() == [pd.Timestamp('2025-02-01'), pd.Timestamp('2025-12-01')]
+    assert unparsed.tolist() == [False, False, True, False]
+    assert parsed_series.iloc[3] == pd.Timestamp('2025-01-14')
+
+    # With the whole column sampled, day-first parses more strings and is used throughout
+    parsed_series, unparsed = dc.parse_dates(date_series)
+    assert parsed_series.tolist() == [pd.Timestamp(i) for i in ('2025-01-02', '2025-01-12', '2025-01-13', '2025-01-14')]
+    assert not unparsed.any()
+
+
+
+# Requires: None.
+# Modifies: None.
+# Effects: Returns about n_rows rows of random values at irregular times, a few hours apart, sorted by date.
+def _tick_file(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2025-01-01 05:00') + pd.to_timedelta(np.cumsum(rng.integers(1, 8, size=n_rows)), unit='h')
+
+    return pd.DataFrame({'Date': dates, 'Price': rng.normal(size=n_rows).cumsum(), 'Volume': rng.integers(1, 100, n_rows)})
+
+
+
+@pytest.mark.parametrize('freq', ['D', 'W', '6h'])
+@pytest.mark.parametrize('how', ['sum', 'mean', 'ohlc'])
+def test_resample_data_chunked_matches_single_pass(freq, how):
+    target_file = _tick_file(300)
+
+    single_pass = dc.resample_data(target_file, 'Date', freq=freq, how=how, chunk_size=len(target_file))
+    chunked = dc.resample_data(target_file, 'Date', freq=freq, how=how, chunk_size=7)
+
+    pd.testing.assert_frame_equal(chunked, single_pass)
+    if how != 'ohlc':
+        expected = target_file.resample(freq, on='Date', origin='epoch' if freq == '6h' else 'start_day').agg(how)
+        assert np.allclose(single_pass[['Price', 'Volume']].values, expected.values, equal_nan=True)
+
+
+
+def test_resample_data_rejects_unsorted_rows():
+    target_file = _tick_file(50).iloc[::-1]
+
+    with pytest.raises(ValueError, match='sorted'):
+        dc.resample_data(target_file, 'Date', freq='D', chunk_size=10)
+
+
+
+@pytest.mark.parametrize('method_input, normalize', [('minmax', dc.normalize_min_max), ('zscore', dc.normalize_z_score)])
+def test_normalize_data_passes_inplace_through(monkeypatch, method_input, normalize):
+    monkeypatch.setattr('builtins.input', lambda: method_input)
+    # Normality tests are only shown to help the user choose a method
+    monkeypatch.setattr(uf, 'normal_test', lambda **kwargs: None)
+    expected_file = normalize(_gaussian_file(100, 3), 'Date')
+    target_file = _gaussian_file(100, 3)
+
+    normalized_file = dc.normalize_data(target_file, 'Date', inplace=True)
+
+    assert normalized_file is target_file
+    pd.testing.assert_frame_equal(normalized_file, expected_file)
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import data_analysis as da
+import forecast_service as fs
+
+# Stand-ins with the forecast interface of a fitted ARIMA result, so the service can be tested without fitting models.
+# _SlowModel blocks in forecast until _release is set.
+_started = threading.Event()
+_release = threading.Event()
+
+
+class _TrendModel:
+    def __init__(self, name, slope):
+        self.model = SimpleNamespace(endog_names=name)
+        self.slope = slope
+
+    def forecast(self, steps):
+        return self.slope * np.arange(1, steps + 1)
+
+
+
+class _SlowModel(_TrendModel):
+    def forecast(self, steps):
+        _started.set()
+        _release.wait(10)
+        return super().forecast(steps)
+
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    da.save_model(_TrendModel('Revenue', 2.0), str(tmp_path / 'revenue.pkl'))
+    da.save_model(_TrendModel('Cost', -1.0), str(tmp_path / 'cost.pkl'))
+    da.save_model(_SlowModel('Slow', 1.0), str(tmp_path / 'slow.pkl'))
+    _started.clear()
+    _release.clear()
+    yield str(tmp_path)
+    _release.set()
+
+
+
+# Requires: server should be returned by forecast_service.start_service.
+# Modifies: None.
+# Effects: Sends a request to server on localhost and returns the status code and the decoded JSON body.
+def _call(server, path, body=None):
+    url = 'http://127.0.0.1:' + str(server.server_address[1]) + path
+    data = None if body is None else json.dumps(body).encode('utf-8')
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+
+def test_service_answers_concurrent_requests(model_dir):
+    server = fs.start_service(model_dir)
+    try:
+        request_list = [{'model': ('revenue', 'cost')[n % 2], 'steps': n % 7 + 1} for n in range(40)]
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            responses = list(executor.map(lambda body: _call(server, '/forecast', body), request_list))
+
+        for body, (status, response) in zip(request_list, responses):
+            slope, name = (2.0, 'Revenue') if body['model'] == 'revenue' else (-1.0, 'Cost')
+            assert status == 200
+            assert response['forecast'] == {name: (slope * np.arange(1, body['steps'] + 1)).tolist()}
+
+        assert _call(server, '/forecast', {'model': 'missing', 'steps': 1})[0] == 404
+        assert _call(server, '/forecast', {'model': 'revenue', 'steps': 0})[0] == 400
+
+        status, stats = _call(server, '/stats')
+        assert status == 200
+        assert stats['requests'] == 41
+        assert stats['p50_ms'] is not None
+    finally:
+        fs.stop_service(server)
+
+
+
+def test_request_times_out(model_dir):
+    server = fs.start_service(model_dir, request_timeout=0.2)
+    try:
+        status, response = _call(server, '/forecast', {'model': 'slow', 'steps': 1})
+        assert status == 504
+    finally:
+        _release.set()
+        fs.stop_service(server)
+
+
+
+def test_stop_service_fails_queued_requests(model_dir):
+    server = fs.start_service(model_dir, max_wait_ms=0)
+    service = server.service
+    outcome = {}
+
+    def request(key, model_name):
+        try:
+            outcome[key] = fs.request_forecast(service, model_name, 1)
+        except RuntimeError as error:
+            outcome[key] = error
+
+    slow_thread = threading.Thread(target=request, args=('slow', 'slow'))
+    slow_thread.start()
+    assert _started.wait(5)
+    queued_thread = threading.Thread(target=request, args=('queued', 'revenue'))
+    queued_thread.start()
+    while service['pending'].qsize() == 0:
+        time.sleep(0.01)
+
+    # Stopping while the batch loop is busy, so the queued request can only be answered by stop_service
+    stop_thread = threading.Thread(target=fs.stop_service, args=(server,))
+    stop_thread.start()
+    queued_thread.join(5)
+    assert isinstance(outcome['queued'], RuntimeError)
+
+    _release.set()
+    stop_thread.join(5)
+    slow_thread.join(5)
+    assert not stop_thread.is_alive()
+    assert outcome['slow'] == {'Slow': [1.0]}
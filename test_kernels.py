@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import kernels
+
+pytest.importorskip('numba')
+
+
+@pytest.fixture
+def restore_backend():
+    previous_backend = kernels.get_backend()
+    yield
+    kernels.set_backend(previous_backend)
+
+
+
+# Requires: None.
+# Modifies: Backend used by kernels.
+# Effects: Returns the output of kernel_call with the NumPy backend and with the Numba backend.
+def _run_both(kernel_call):
+    kernels.set_backend('numpy')
+    numpy_output = kernel_call()
+    kernels.set_backend('numba')
+    numba_output = kernel_call()
+
+    return numpy_output, numba_output
+
+
+
+def _data(n_rows=500, n_cols=4):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(n_rows, n_cols))
+    data[:, -1] = 3.0  # constant column
+
+    return data
+
+
+
+@pytest.mark.parametrize('order', [0, 1, 2, 5])
+def test_diff_backends_agree(restore_backend, order):
+    values = _data()[:, 0]
+    numpy_output, numba_output = _run_both(lambda: kernels.diff(values, order))
+
+    assert np.allclose(numpy_output, numba_output, equal_nan=True)
+
+
+
+def test_mahalanobis_backends_agree(restore_backend):
+    data = _data()[:, :-1]
+    mean = data.mean(axis=0)
+    inverse_cov = np.linalg.inv(np.cov(data, rowvar=False))
+    numpy_output, numba_output = _run_both(lambda: kernels.mahalanobis(data, mean, inverse_cov))
+
+    assert np.allclose(numpy_output, numba_output)
+
+
+
+@pytest.mark.parametrize('kernel', [kernels.z_score, kernels.min_max])
+@pytest.mark.parametrize('n_cols', [1, 4])
+def test_scaling_backends_agree(restore_backend, kernel, n_cols):
+    values = _data()[:, -n_cols:] if n_cols > 1 else _data()[:, 0]
+    numpy_output, numba_output = _run_both(lambda: kernel(values))
+
+    assert numpy_output.shape == values.shape
+    assert np.allclose(numpy_output, numba_output)
@@ -0,0 +1,24 @@
+import json
+import numpy as np
+import pandas as pd
+import report as rp
+
+
+
+def _reject_constant(constant):
+    raise AssertionError(constant + ' is not valid JSON')
+
+
+
+def test_report_to_json_writes_missing_values_as_null(monkeypatch):
+    # Keeping the active report of other tests untouched
+    monkeypatch.setattr(rp, '_active', dict(rp._active))
+    report = rp.start_report(verbosity=0)
+    rp.record_forecast('ARIMA', pd.Series([1.0, np.nan, np.inf], name='Revenue'))
+    rp.record_test('ADF', np.float64(np.nan), 0.5, column='Revenue')
+
+    parsed_report = json.loads(rp.report_to_json(report), parse_constant=_reject_constant)
+
+    assert parsed_report['forecasts'][0]['values'] == {'Revenue': [1.0, None, None]}
+    assert parsed_report['tests'][0]['statistic'] is None
+    assert parsed_report['tests'][0]['p_value'] == 0.5
@@ -1,11 +1,14 @@
 from scipy import stats
+import report as rp
 
 
 # Requires: none.
 # Modifies: target_file.
-# Effects: Takes multiple indices from user and delete inputted indies from the data
+# Effects: Takes multiple indices from user and delete inputted indies from the data. If return_deleted is True, the
+#          list of deleted indices (before resetting the index) is returned together with the data.
 #Example: '11,12,13' -> 1st index to delete = 11, 2nd index to delete = 12, 3rd index to delete = 13
-def del_file_data(target_file):
+def del_file_data(target_file, return_deleted=False):
+    deleted_index = []
     while True:
         del_index = ''
         del del_index
@@ -30,6 +33,7 @@ def del_file_data(target_file):
                     break
                 else:
                     target_file.drop(index=temp, inplace=True)
+                    deleted_index.append(temp)
                     i = j + 1
                     j += 1
                     error_stat = False
@@ -44,6 +48,7 @@ def del_file_data(target_file):
                     break
                 else:
                     target_file.drop(index=temp, inplace=True)
+                    deleted_index.append(temp)
                     j += 1
                     error_stat = False
 
@@ -52,6 +57,9 @@ def del_file_data(target_file):
 
     target_file.reset_index(drop=True, inplace=True)
 
+    if return_deleted:
+        return target_file, deleted_index
+
     return target_file
 
 
@@ -126,7 +134,9 @@ def normal_test(target_file, date_col_name, alpha):
     print('Normality tests:', end='\n')
     if len(target_file.columns) > 1:
         # Henze-Zirkler test
-        HZ_pval = pg.multivariate_normality(target_file)[1]
+        HZ_result = pg.multivariate_normality(target_file)
+        HZ_pval = HZ_result[1]
+        rp.record_test('Henze-Zirkler', HZ_result[0], HZ_pval, alpha=alpha)
         if HZ_pval < alpha:
             print('Distribution is normal based on Henze-Zirkler test with significance level (alpha) of', alpha,
                   end='\n')
@@ -136,7 +146,9 @@ def normal_test(target_file, date_col_name, alpha):
 
     elif len(target_file.columns) == 1:
         # Shapiro-Wilk test
-        SW_pval = stats.shapiro(target_file)[1]
+        SW_result = stats.shapiro(target_file)
+        SW_pval = SW_result[1]
+        rp.record_test('Shapiro-Wilk', SW_result[0], SW_pval, alpha=alpha)
         if SW_pval < alpha:
             print('Distribution is normal based on Shapiro-Wilk test with significance level (alpha) of', alpha,
                   end='\n')
@@ -144,7 +156,9 @@ def normal_test(target_file, date_col_name, alpha):
             print('Distribution is not normal based on Shapiro-Wilk test with significance level (alpha) of', alpha,
                   end='\n')
         # Kolmogorov-Smirnov test
-        KS_pval = stats.kstest(target_file, 'norm')[1]
+        KS_result = stats.kstest(target_file, 'norm')
+        KS_pval = KS_result[1]
+        rp.record_test('Kolmogorov-Smirnov', KS_result[0], KS_pval, alpha=alpha)
         if KS_pval < alpha:
             print('Distribution is normal based on Kolmogorov-Smirnov test with significance level (alpha) of', alpha,
                   end='\n')
@@ -152,7 +166,9 @@ def normal_test(target_file, date_col_name, alpha):
             print('Distribution is not normal based on Kolmogorov-Smirnov test with significance level (alpha) of', alpha,
                   end='\n')
         # Jarque-Bera test
-        JB_pval = stats.jarque_bera(target_file)[1]
+        JB_result = stats.jarque_bera(target_file)
+        JB_pval = JB_result[1]
+        rp.record_test('Jarque-Bera', JB_result[0], JB_pval, alpha=alpha)
         if JB_pval < alpha:
             print('Distribution is normal based on Jarque-Bera test with significance level (alpha) of', alpha,
                   end='\n')
@@ -163,3 +179,26 @@ def normal_test(target_file, date_col_name, alpha):
 
     print('------------------------------------------------------------------------------------------------',
           end='\n')
+
+
+
+# Requires: 1st, func should take target_file as its first argument
+#
+#           2nd, target_file should be a dataframe
+# Modifies: Possibly target_file, depending on func.
+# Effects: Runs func(target_file, *args, **kwargs) while tracing memory allocations, and returns the result of func
+#          and its peak memory use as a multiple of the memory used by target_file.
+# Example: peak_memory_ratio(dc.arrange_file, df, 'Date') -> (sorted df, 1.1) if sorting needed 10% extra memory
+def peak_memory_ratio(func, target_file, *args, **kwargs):
+    import tracemalloc
+
+    input_size = target_file.memory_usage(index=True, deep=True).sum()
+
+    tracemalloc.start()
+    try:
+        result = func(target_file, *args, **kwargs)
+        peak_size = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, peak_size / input_size